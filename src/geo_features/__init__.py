@@ -2,11 +2,16 @@
 
 # Expose submodules:
 from . import climate_data_store
+from . import distance_reducers
+from . import h3_cache
 from . import utils
 
 # Expose commonly-used classes and functions directly:
-from .geodetic_distance import CoordinateGeodeticDistance, GeodeticDistance
+from .geodetic_distance import CoordinateGeodeticDistance, GeodeticDistance, GeodeticNeighbourIndex
 from .least_cost_distance import CoordinateLeastCostDistance, LeastCostDistance
+from .tiled_least_cost_distance import TiledLeastCostDistance
+from .nearest_feature_distance import NearestFeatureDistance
+from .connectivity import gravity_connectivity
 
 from .summarise_raster import summarise_raster, summarise_categorical_raster
 from .find_representative_points import find_representative_points
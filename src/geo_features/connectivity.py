@@ -0,0 +1,159 @@
+# Functions for calculating connectivity between locations (e.g., gravity models of
+# movement), based on the geodetic distances between them
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .geodetic_distance import CoordinateGeodeticDistance
+
+
+def power_law_kernel(exponent, min_distance=1.0):
+    """
+    Create a power-law distance kernel, K(d) = max(d, min_distance) ^ -exponent.
+
+    Parameters
+    ----------
+    exponent: Rate at which connectivity declines with distance.
+    min_distance: Distances are truncated at this value to avoid infinite values for
+                  co-located points (default: 1, i.e. 1 metre).
+
+    Returns
+    -------
+    A function taking a numpy array of distances and returning kernel values.
+    """
+    def kernel(dists):
+        return np.maximum(dists, min_distance) ** -exponent
+
+    return kernel
+
+
+def exponential_kernel(scale):
+    """
+    Create an exponential distance kernel, K(d) = exp(-d / scale).
+
+    Parameters
+    ----------
+    scale: Distance over which connectivity declines by a factor of e.
+
+    Returns
+    -------
+    A function taking a numpy array of distances and returning kernel values.
+    """
+    def kernel(dists):
+        return np.exp(-dists / scale)
+
+    return kernel
+
+
+def _radiation_block(dists, masses, row_slice):
+    """
+    Calculate radiation model connectivity for a block of rows, covering all destinations.
+
+    Connectivity from i to j is m_i * m_i * m_j / ((m_i + s_ij) * (m_i + m_j + s_ij)),
+    where s_ij is the total mass of locations strictly closer to i than j is (excluding i
+    and j).
+    """
+    origin_masses = masses[row_slice][:, None]
+
+    # Total mass of all locations closer than each destination (excluding the destination)
+    order = np.argsort(dists, axis=1, kind="stable")
+    sorted_masses = masses[order]
+    closer_mass = np.cumsum(sorted_masses, axis=1) - sorted_masses
+
+    # Equally distant destinations all take the closer mass of the first of them
+    sorted_dists = np.take_along_axis(dists, order, axis=1)
+    columns = np.arange(sorted_dists.shape[1])
+    tie_start = np.ones(sorted_dists.shape, dtype=bool)
+    tie_start[:, 1:] = sorted_dists[:, 1:] != sorted_dists[:, :-1]
+    first_tied = np.maximum.accumulate(np.where(tie_start, columns, 0), axis=1)
+    closer_mass = np.take_along_axis(closer_mass, first_tied, axis=1)
+
+    s = np.empty_like(closer_mass)
+    np.put_along_axis(s, order, closer_mass, axis=1)
+
+    # Exclude the origin itself
+    s = np.maximum(s - origin_masses, 0)
+
+    return (origin_masses * origin_masses * masses[None, :]
+            / ((origin_masses + s) * (origin_masses + masses[None, :] + s)))
+
+
+def gravity_connectivity(locations, masses, kernel, threshold=None, top_k=None,
+                         max_block_size=10000000, distance=None, use_centroids=True):
+    """
+    Calculate a sparse connectivity matrix between all pairs of locations, with
+    connectivity from i to j given by m_i * m_j * K(d_ij) for a distance kernel K (a
+    gravity model), or by the radiation model.
+
+    Distances are calculated and converted to connectivity one block of origins at a
+    time, so that peak memory use is bounded by `max_block_size`. Connections from each
+    location to itself are excluded.
+
+    Parameters
+    ----------
+    locations: A sequence of locations, either (lat, lon) tuples or shapely objects (see
+               `CoordinateGeodeticDistance.get_pairwise_distances()`).
+    masses: A numpy array of masses (e.g., population sizes), one for each location.
+    kernel: Either a function taking a numpy array of distances and returning kernel
+            values (see `power_law_kernel()` and `exponential_kernel()`), or "radiation"
+            to use the radiation model.
+    threshold: Optional minimum connectivity; smaller values are dropped (default: None).
+    top_k: Optional number of strongest connections to keep for each origin (default:
+           None, i.e. keep all).
+    max_block_size: Maximum number of distances held in memory at once.
+    distance: A `CoordinateGeodeticDistance` object used to calculate distances (default:
+              None, i.e. geodesic distances on the WGS84 ellipsoid).
+    use_centroids: A boolean indicating whether to use the centroids of any non-point objects
+                   (True) or reprentative points instead (False).
+
+    Returns
+    -------
+    A scipy sparse matrix in CSR format, with one row per origin and one column per
+    destination.
+    """
+    if distance is None:
+        distance = CoordinateGeodeticDistance()
+
+    masses = np.asarray(masses, dtype=float)
+    n_locations = len(masses)
+    block_rows = max(max_block_size // max(n_locations, 1), 1)
+
+    row_parts = []
+    col_parts = []
+    value_parts = []
+
+    blocks = distance.iter_distance_blocks(locations, locations, (block_rows, n_locations),
+                                           use_centroids=use_centroids)
+
+    for row_slice, _, dists in blocks:
+        if kernel == "radiation":
+            values = _radiation_block(dists, masses, row_slice)
+        else:
+            values = masses[row_slice][:, None] * masses[None, :] * kernel(dists)
+
+        # Exclude self-connections
+        rows = np.arange(row_slice.start, row_slice.stop)
+        values[rows - row_slice.start, rows] = 0
+
+        if top_k is not None and top_k < n_locations:
+            # Zero all but the k largest values in each row
+            smallest = np.argpartition(values, n_locations - top_k, axis=1)[:, :(n_locations - top_k)]
+            np.put_along_axis(values, smallest, 0, axis=1)
+
+        keep = values > 0
+
+        if threshold is not None:
+            keep &= values >= threshold
+
+        block_rows_inds, block_cols = np.nonzero(keep)
+        row_parts.append(block_rows_inds + row_slice.start)
+        col_parts.append(block_cols)
+        value_parts.append(values[keep])
+
+    if len(value_parts) == 0:
+        return csr_matrix((n_locations, n_locations))
+
+    return csr_matrix(
+        (np.concatenate(value_parts), (np.concatenate(row_parts), np.concatenate(col_parts))),
+        shape=(n_locations, n_locations)
+    )
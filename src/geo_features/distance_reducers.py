@@ -0,0 +1,166 @@
+# Reducers summarising blocks of a distance matrix, allowing summaries of large
+# origin x destination distance matrices to be calculated one block at a time
+
+import abc
+
+import numpy as np
+
+
+class DistanceReducer(abc.ABC):
+    """
+    Base class for objects summarising the distances from each origin to a set of
+    destinations, when distances are calculated in blocks.
+
+    Each block is first summarised using `reduce()`, after which partial summaries for
+    different blocks of destinations are merged using `combine()`. Once all blocks have
+    been processed, `finalise()` converts the partial summary to its final form.
+    """
+    @abc.abstractmethod
+    def reduce(self, block, col_slice):
+        """
+        Summarise a block of distances.
+
+        Parameters
+        ----------
+        block: A numpy array of distances, with one row per origin and one column per
+               destination.
+        col_slice: A slice indicating which destinations are included in `block`.
+
+        Returns
+        -------
+        A partial summary for the origins in `block`.
+        """
+        pass
+
+    @abc.abstractmethod
+    def combine(self, summary, other):
+        """
+        Merge two partial summaries for the same origins.
+        """
+        pass
+
+    def finalise(self, summary):
+        """
+        Convert a partial summary to its final form (by default, returned unchanged).
+        """
+        return summary
+
+
+class NearestDestination(DistanceReducer):
+    """
+    Find the distance to, and index of, the nearest destination for each origin.
+
+    Final summaries are (distances, indices) tuples of numpy arrays.
+    """
+    def reduce(self, block, col_slice):
+        inds = block.argmin(axis=1)
+        dists = block[np.arange(block.shape[0]), inds]
+
+        return dists, inds + col_slice.start
+
+    def combine(self, summary, other):
+        use_other = other[0] < summary[0]
+
+        return (np.where(use_other, other[0], summary[0]),
+                np.where(use_other, other[1], summary[1]))
+
+
+class KNearestDestinations(DistanceReducer):
+    """
+    Find the distances to, and indices of, the k nearest destinations for each origin.
+
+    Final summaries are (distances, indices) tuples of numpy arrays with k columns,
+    sorted from nearest to furthest. If there are fewer than k destinations, remaining
+    columns have infinite distance and index -1.
+    """
+    def __init__(self, k):
+        """
+        Parameters
+        ----------
+        k: Number of destinations to find.
+        """
+        if k < 1:
+            raise ValueError("k must be >= 1.")
+
+        self.k = k
+
+    def reduce(self, block, col_slice):
+        inds = np.broadcast_to(np.arange(col_slice.start, col_slice.stop), block.shape)
+        return self._k_smallest(block, inds)
+
+    def combine(self, summary, other):
+        dists = np.concatenate([summary[0], other[0]], axis=1)
+        inds = np.concatenate([summary[1], other[1]], axis=1)
+
+        return self._k_smallest(dists, inds)
+
+    def finalise(self, summary):
+        dists, inds = summary
+        order = np.argsort(dists, axis=1, kind="stable")
+
+        return np.take_along_axis(dists, order, axis=1), np.take_along_axis(inds, order, axis=1)
+
+    def _k_smallest(self, dists, inds):
+        """
+        Keep the k smallest distances in each row (unsorted), padding if needed.
+        """
+        n_missing = self.k - dists.shape[1]
+
+        if n_missing > 0:
+            dists = np.pad(dists, ((0, 0), (0, n_missing)), constant_values=np.inf)
+            inds = np.pad(inds, ((0, 0), (0, n_missing)), constant_values=-1)
+
+        keep = np.argpartition(dists, self.k - 1, axis=1)[:, :self.k]
+
+        return np.take_along_axis(dists, keep, axis=1), np.take_along_axis(inds, keep, axis=1)
+
+
+class CountWithin(DistanceReducer):
+    """
+    Count the destinations within a given distance of each origin.
+
+    Final summaries are numpy arrays of counts.
+    """
+    def __init__(self, radius):
+        """
+        Parameters
+        ----------
+        radius: Maximum distance (inclusive), in the same units as distances.
+        """
+        self.radius = radius
+
+    def reduce(self, block, col_slice):
+        return (block <= self.radius).sum(axis=1)
+
+    def combine(self, summary, other):
+        return summary + other
+
+
+class KernelSum(DistanceReducer):
+    """
+    Sum a distance kernel over destinations for each origin, optionally weighting each
+    destination (e.g., by population size).
+
+    Final summaries are numpy arrays of sums.
+    """
+    def __init__(self, kernel, weights=None):
+        """
+        Parameters
+        ----------
+        kernel: A function taking a numpy array of distances and returning an array of
+                the same shape (e.g., `lambda d: np.exp(-d / 10000)`).
+        weights: An optional numpy array of weights, one for each destination.
+        """
+        self.kernel = kernel
+        self.weights = None if weights is None else np.asarray(weights, dtype=float)
+
+    def reduce(self, block, col_slice):
+        values = self.kernel(block)
+
+        if self.weights is not None:
+            values = values * self.weights[col_slice]
+
+        return values.sum(axis=1)
+
+    def combine(self, summary, other):
+        return summary + other
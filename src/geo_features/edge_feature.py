@@ -2,11 +2,17 @@
 # locations, such as distance)
 
 import abc
+from os import PathLike, fspath, remove, replace
+from os.path import abspath, dirname, exists, samefile
+from tempfile import mkstemp
+from time import perf_counter
 
 from numpy import full as np_full
 from numpy import save as np_save
 from numpy import load as np_load
-from numpy import nan, isnan
+from numpy import (asarray, atleast_1d, broadcast_arrays, broadcast_to, fromiter, intp, 
+                   maximum, memmap, minimum, nan, isnan, triu_indices, unique, where)
+from numpy.lib.format import open_memmap
 
 class CachedEdgeFeature(abc.ABC):
     """
@@ -15,16 +21,154 @@ class CachedEdgeFeature(abc.ABC):
         
     Values can be retreived by specifying the origin and destination node names. The 
     stored values can also be saved for later use using the save and restore methods.
+    
+    Cache usage is recorded in `n_hits` (values found in the data store), `n_misses`
+    (values that had to be calculated) and `calculate_time` (total seconds spent in 
+    `calculate()`).
+    
+    By default values are stored in memory. When `cache_file` is specified, the data store 
+    is instead a memory-mapped ".npy" file: only the parts of the file which are accessed 
+    are read into memory, and calculated values are written back to the file. Several 
+    processes can share the same cache file, provided they do not write to it at the same 
+    time.
+    
+    For symmetric features (where the value from a to b always equals the value from b to 
+    a), set `symmetric=True` to store only the upper triangle of the matrix (including the 
+    diagonal) as a packed 1-d array, in row-major order. Values for (b, a) are then 
+    retrieved from those stored for (a, b), so each pair is only calculated once.
+    
+    When only edges between nearby nodes are needed, `neighbours` can be used to restrict 
+    the data store to a fixed number of neighbours per node. Values are then stored in an
+    array with one row per node and one column per neighbour, so memory use scales with
+    the number of neighbours rather than the number of nodes. Values for other pairs of 
+    nodes are calculated as needed, but not stored.
     """
-    def __init__(self, node_names):
+    def __init__(self, node_names, cache_calculated=True, cache_file=None, symmetric=False,
+                 neighbours=None):
         """
         Parameters
         ----------
         node_names: List of names used to index stored features.
+        cache_calculated: Whether values calculated by `get()` should be saved in the data 
+                          store (default: True). Set to False for features which should 
+                          not be cached.
+        cache_file: Optional path to a ".npy" file used as an on-disk data store. If the 
+                    file exists, previously-stored values are re-used; otherwise a new
+                    file is created (default: None, i.e. store values in memory).
+        symmetric: Whether the feature is symmetric, in which case only the upper triangle
+                   of values is stored (default: False).
+        neighbours: Optional integer array with one row per node, listing the indices (in 
+                    `node_names`) of nodes for which values should be stored. Rows with 
+                    fewer neighbours should be padded with -1. When `symmetric` is True, 
+                    each pair of nodes only needs to be listed in one of their rows 
+                    (default: None, i.e. store values for all pairs of nodes).
         """
-        n_nodes = len(node_names)
         self.node_names = node_names
-        self.stored_values = np_full((n_nodes, n_nodes), nan)
+        self.node_index = {name: i for i, name in enumerate(node_names)}
+        self.cache_calculated = cache_calculated
+        self.cache_file = cache_file
+        self.symmetric = symmetric
+        self.neighbours = None if neighbours is None else asarray(neighbours, dtype=intp)
+        self.reset_stats()
+        
+        shape = self._store_shape()
+        
+        if cache_file is None:
+            self.stored_values = np_full(shape, nan)
+        elif exists(cache_file):
+            self.restore(cache_file, mmap_mode="r+")
+        else:
+            self.stored_values = open_memmap(cache_file, mode="w+", dtype=float, shape=shape)
+            self.stored_values[:] = nan
+            self.stored_values.flush()
+    
+    def _store_shape(self):
+        """
+        Shape of the array used to store values.
+        """
+        n_nodes = len(self.node_names)
+        
+        if self.neighbours is not None:
+            return self.neighbours.shape
+        
+        if self.symmetric:
+            return (n_nodes * (n_nodes + 1) // 2, )
+        
+        return (n_nodes, n_nodes)
+    
+    def _value_index(self, from_inds, to_inds):
+        """
+        Convert arrays of node indices to positions in the flattened `stored_values`, 
+        with -1 indicating pairs which are not stored.
+        """
+        n_nodes = len(self.node_names)
+        
+        if self.symmetric:
+            # Swap (b, a) to (a, b)
+            from_inds, to_inds = minimum(from_inds, to_inds), maximum(from_inds, to_inds)
+        
+        if self.neighbours is not None:
+            # Find the column listing each destination in the origin's neighbour table
+            n_neighbours = self.neighbours.shape[1]
+            matches = self.neighbours[from_inds] == to_inds[:, None]
+            value_inds = from_inds * n_neighbours + matches.argmax(axis=1)
+            found = matches.any(axis=1)
+            
+            if self.symmetric:
+                # Pairs may only be listed in the destination's row
+                swapped = self.neighbours[to_inds] == from_inds[:, None]
+                use_swapped = ~found & swapped.any(axis=1)
+                value_inds = where(use_swapped, to_inds * n_neighbours + swapped.argmax(axis=1),
+                                   value_inds)
+                found |= use_swapped
+            
+            value_inds[~found] = -1
+            
+            return value_inds
+        
+        if not self.symmetric:
+            return from_inds * n_nodes + to_inds
+        
+        # Position in the packed upper triangle
+        row, col = from_inds, to_inds
+        return row * n_nodes - row * (row - 1) // 2 + (col - row)
+    
+    def _flat_values(self):
+        """
+        A flattened view of `stored_values` (writing to it updates the data store).
+        """
+        return self.stored_values.reshape(-1)
+    
+    def reset_stats(self):
+        """
+        Reset the cache usage counters.
+        
+        Returns
+        -------
+        None
+        """
+        self.n_hits = 0
+        self.n_misses = 0
+        self.calculate_time = 0.0
+    
+    def cache_info(self):
+        """
+        Summarise cache usage since the object was created (or `reset_stats()` was last
+        called).
+        
+        Returns
+        -------
+        A dict with keys "hits", "misses", "hit_rate" and "calculate_time".
+        """
+        n_lookups = self.n_hits + self.n_misses
+        hit_rate = self.n_hits / n_lookups if n_lookups > 0 else nan
+        
+        return {
+            "hits": self.n_hits,
+            "misses": self.n_misses,
+            "hit_rate": hit_rate,
+            "calculate_time": self.calculate_time
+        }
     
     def get(self, from_node, to_node):
         """
@@ -39,18 +183,28 @@ class CachedEdgeFeature(abc.ABC):
         -------
         float
         """
-        from_ind = self.node_names.index(from_node)
-        to_ind = self.node_names.index(to_node)
-        val = self.stored_values[from_ind, to_ind]
+        from_inds, to_inds = self._node_inds(from_node, to_node)
+        value_ind = self._value_index(from_inds, to_inds)[0]
+        val = self._flat_values()[value_ind] if value_ind >= 0 else nan
         
         if isnan(val):
+            self.n_misses += 1
+            
+            start_time = perf_counter()
             val = self.calculate(from_node, to_node)
+            self.calculate_time += perf_counter() - start_time
+            
+            if self.cache_calculated and value_ind >= 0:
+                self._flat_values()[value_ind] = val
+        else:
+            self.n_hits += 1
         
         return val
     
     def set(self, from_node, to_node, value):
         """
-        Save a calculated value in the internal data store.
+        Save a calculated value in the internal data store. Values for pairs of nodes 
+        which are not stored (see `neighbours`) are ignored.
         
         Parameters
         ----------
@@ -62,43 +216,237 @@ class CachedEdgeFeature(abc.ABC):
         -------
         None
         """
-        from_ind = self.node_names.index(from_node)
-        to_ind = self.node_names.index(to_node)
-        self.stored_values[from_ind, to_ind] = value
+        self.set_many(from_node, to_node, value)
+    
+    def get_many(self, from_nodes, to_nodes):
+        """
+        Retreive edge features for many (from_node, to_node) pairs at once, calculating 
+        only those values not already in the data store.
+        
+        Parameters
+        ----------
+        from_nodes: An iterable of origin node identifiers present in `node_names`.
+        to_nodes: An iterable of destination node identifiers, of the same length as
+                  `from_nodes` (or a single identifier, used for all origins).
+        
+        Returns
+        -------
+        A numpy array of values, one for each pair.
+        """
+        from_inds, to_inds = self._node_inds(from_nodes, to_nodes)
+        value_inds = self._value_index(from_inds, to_inds)
+        is_stored = value_inds >= 0
+        flat_values = self._flat_values()
+        
+        vals = np_full(value_inds.shape, nan)
+        vals[is_stored] = flat_values[value_inds[is_stored]]
+        
+        missing = isnan(vals)
+        n_missing = int(missing.sum())
+        self.n_hits += len(vals) - n_missing
+        
+        if n_missing > 0:
+            # Pairs requested more than once (or in both directions, for symmetric features)
+            # are only calculated once. Pairs which are not stored get unique negative keys.
+            n_nodes = len(self.node_names)
+            keys = where(is_stored, value_inds, -1 - (from_inds * n_nodes + to_inds))
+            
+            miss_keys, first, inverse = unique(keys[missing], return_index=True, 
+                                               return_inverse=True)
+            miss_from = from_inds[missing][first]
+            miss_to = to_inds[missing][first]
+            self.n_misses += len(miss_keys)
+            
+            start_time = perf_counter()
+            new_vals = self.calculate_many(
+                [self.node_names[i] for i in miss_from],
+                [self.node_names[i] for i in miss_to]
+            )
+            self.calculate_time += perf_counter() - start_time
+            
+            vals[missing] = new_vals[inverse.reshape(-1)]
+            
+            if self.cache_calculated:
+                store = miss_keys >= 0
+                flat_values[miss_keys[store]] = new_vals[store]
+        
+        return vals
+    
+    def set_many(self, from_nodes, to_nodes, values):
+        """
+        Save many calculated values in the internal data store at once. Values for pairs 
+        of nodes which are not stored (see `neighbours`) are ignored.
+        
+        Parameters
+        ----------
+        from_nodes: An iterable of origin node identifiers present in `node_names`.
+        to_nodes: An iterable of destination node identifiers, of the same length as
+                  `from_nodes` (or a single identifier, used for all origins).
+        values: An iterable of values to store (or a single value, used for all pairs).
+        
+        Returns
+        -------
+        None
+        """
+        from_inds, to_inds = self._node_inds(from_nodes, to_nodes)
+        value_inds = self._value_index(from_inds, to_inds)
+        values = broadcast_to(asarray(values, dtype=float), value_inds.shape)
+        
+        is_stored = value_inds >= 0
+        self._flat_values()[value_inds[is_stored]] = values[is_stored]
+    
+    def _node_inds(self, from_nodes, to_nodes):
+        """
+        Convert node identifiers to matching arrays of indices into `node_names`.
+        """
+        from_inds = self._lookup_nodes(from_nodes)
+        to_inds = self._lookup_nodes(to_nodes)
+        
+        return broadcast_arrays(atleast_1d(from_inds), atleast_1d(to_inds))
+    
+    def _lookup_nodes(self, nodes):
+        """
+        Convert a single node identifier, or an iterable of them, to indices.
+        """
+        if isinstance(nodes, str) or not hasattr(nodes, "__iter__"):
+            return asarray(self.node_index[nodes], dtype=intp)
+        
+        return fromiter((self.node_index[n] for n in nodes), dtype=intp)
     
     def save(self, filename):
         """
-        Save the stored values to disk in numpy's ".npy" format.
+        Save the stored values to disk in numpy's ".npy" format. For symmetric features, 
+        the packed upper triangle is saved.
+        
+        Saving to the file backing a memory-mapped data store only flushes it. Other files 
+        are written to a temporary file first, then renamed.
         
         Parameters
         ----------
-        filename: Location to save to.
+        filename: Location to save to (or an open file).
+        
+        Returns
+        -------
+        None
+        """
+        if isinstance(self.stored_values, memmap):
+            self.stored_values.flush()
+        
+        if not isinstance(filename, (str, PathLike)):
+            np_save(filename, self.stored_values)
+            return
+        
+        # As in np.save, which adds the extension if needed
+        filename = fspath(filename)
+        
+        if not filename.endswith(".npy"):
+            filename += ".npy"
+        
+        backing_file = getattr(self.stored_values, "filename", None)
+        
+        if backing_file is not None and exists(filename) and samefile(filename, backing_file):
+            return
+        
+        # Writing over a file directly would truncate it, even if it's still in use
+        handle, temp_filename = mkstemp(suffix=".npy", dir=dirname(abspath(filename)))
+        
+        try:
+            with open(handle, "wb") as f:
+                np_save(f, self.stored_values)
+            
+            replace(temp_filename, filename)
+        except BaseException:
+            if exists(temp_filename):
+                remove(temp_filename)
+            
+            raise
+    
+    def flush(self):
+        """
+        Write any changes to an on-disk data store (see `cache_file`) to disk. Does 
+        nothing when values are stored in memory.
         
         Returns
         -------
         None
         """
-        np_save(filename, self.stored_values)
+        if isinstance(self.stored_values, memmap):
+            self.stored_values.flush()
         
-    def restore(self, filename):
+    def restore(self, filename, mmap_mode=None):
         """
         Restore a previously-saved set of values from disk. This 
         operation occurs in place.
         
+        Files saved by symmetric features (a packed upper triangle) can be restored into
+        non-symmetric features and vice versa, provided `mmap_mode` and `neighbours` are 
+        None. When restoring a full matrix into a symmetric feature, values missing from 
+        the upper triangle are taken from the lower triangle.
+        
         Parameters
         ----------
         filename: Location to read from.
+        mmap_mode: If not None, memory-map the file instead of reading it into memory,
+                   using the given mode (see `numpy.load`). Use "r+" to write newly 
+                   calculated values back to the file, or "r" to open it read-only 
+                   (in which case `cache_calculated` should be False).
         
         Returns
         -------
         None
         """
-        self.stored_values = np_load(filename)
+        values = np_load(filename, mmap_mode=mmap_mode)
+        
+        n_nodes = len(self.node_names)
+        dense_shape = (n_nodes, n_nodes)
+        packed_shape = (n_nodes * (n_nodes + 1) // 2, )
+        
+        if values.shape != self._store_shape():
+            layouts = (dense_shape, packed_shape)
+            
+            if mmap_mode is not None or self.neighbours is not None or values.shape not in layouts:
+                m = f"Stored values in {filename} have shape {values.shape}, expected {self._store_shape()}."
+                raise ValueError(m)
+            
+            upper_inds = triu_indices(n_nodes)
+            
+            if self.symmetric:
+                # Pack a full matrix
+                packed = values[upper_inds]
+                lower = values.T[upper_inds]
+                packed[isnan(packed)] = lower[isnan(packed)]
+                values = packed
+            else:
+                # Unpack a triangle
+                dense = np_full(dense_shape, nan)
+                dense[upper_inds] = values
+                dense.T[upper_inds] = values
+                values = dense
+        
+        self.stored_values = values
     
     @abc.abstractmethod
     def calculate(self, from_node, to_node):
         """
-        Derived classes must implement a method which calculates 
-        features and saves any obtained values in self.stored_values.
+        Derived classes must implement a method which calculates and returns 
+        features. Values returned are saved in self.stored_values by `get()` 
+        (unless `cache_calculated` is False).
         """
         pass
+    
+    def calculate_many(self, from_nodes, to_nodes):
+        """
+        Calculate features for several pairs of nodes, as used by `get_many()`. By default
+        this calls `calculate()` on each pair, but derived classes can override it with a 
+        vectorised implementation.
+        
+        Parameters
+        ----------
+        from_nodes: A list of origin node identifiers.
+        to_nodes: A list of destination node identifiers, of the same length as `from_nodes`.
+        
+        Returns
+        -------
+        A numpy array of values, one for each pair.
+        """
+        return asarray([self.calculate(f, t) for f, t in zip(from_nodes, to_nodes)], dtype=float)
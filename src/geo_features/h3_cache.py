@@ -0,0 +1,144 @@
+# Size-bounded caches of H3 lookups shared by all edge features, so that repeated queries
+# involving the same hexagon do not repeat conversions. Cache sizes are numbers of
+# entries: centres take about 200 bytes each, but children, points and raster indices
+# grow with the number of children (up to about 30 KB per entry 3 resolutions finer), so
+# their caches are kept small.
+
+from functools import lru_cache
+
+import numpy as np
+from h3 import h3_get_resolution, h3_to_children, h3_to_geo
+
+
+@lru_cache(maxsize=100000)
+def h3_centre(hex_id):
+    """
+    Get the centre of an H3 hexagon.
+
+    Parameters
+    ----------
+    hex_id: An H3 hexagon identifier.
+
+    Returns
+    -------
+    A (lat, lon) tuple.
+    """
+    return h3_to_geo(hex_id)
+
+
+@lru_cache(maxsize=1024)
+def h3_children(hex_id, resolution):
+    """
+    Get the children of an H3 hexagon at a given resolution, in a consistent order.
+
+    Parameters
+    ----------
+    hex_id: An H3 hexagon identifier.
+    resolution: H3 resolution of children.
+
+    Returns
+    -------
+    A tuple of H3 hexagon identifiers.
+    """
+    return tuple(sorted(h3_to_children(hex_id, res=resolution)))
+
+
+@lru_cache(maxsize=1024)
+def h3_points(hex_id, resolution):
+    """
+    Get the coordinates representing an H3 hexagon at a given resolution: either its
+    centre, or the centres of its children when `resolution` is finer.
+
+    Parameters
+    ----------
+    hex_id: An H3 hexagon identifier.
+    resolution: H3 resolution for calculations.
+
+    Returns
+    -------
+    A read-only numpy array with one (lat, lon) row per point.
+    """
+    if h3_get_resolution(hex_id) == resolution:
+        points = np.array([h3_centre(hex_id)])
+    else:
+        points = np.array([h3_centre(c) for c in h3_children(hex_id, resolution)])
+
+    points.flags.writeable = False
+    return points
+
+
+@lru_cache(maxsize=1024)
+def h3_raster_indices(hex_id, resolution, raster_transform):
+    """
+    Get the raster cells containing the points representing an H3 hexagon (see
+    `h3_points()`).
+
+    Parameters
+    ----------
+    hex_id: An H3 hexagon identifier.
+    resolution: H3 resolution for calculations.
+    raster_transform: `rasterio` coefficients mapping pixel coordinates to geographic
+                      coordinates.
+
+    Returns
+    -------
+    A tuple of read-only numpy arrays (rows, cols).
+    """
+    points = h3_points(hex_id, resolution)
+    inverse = ~raster_transform
+    cols = inverse.a * points[:, 1] + inverse.b * points[:, 0] + inverse.c
+    rows = inverse.d * points[:, 1] + inverse.e * points[:, 0] + inverse.f
+
+    rows = np.floor(rows).astype(np.intp)
+    cols = np.floor(cols).astype(np.intp)
+    rows.flags.writeable = False
+    cols.flags.writeable = False
+
+    return rows, cols
+
+
+_cached_functions = {
+    "centre": h3_centre,
+    "children": h3_children,
+    "points": h3_points,
+    "raster_indices": h3_raster_indices
+}
+
+
+def h3_cache_info():
+    """
+    Summarise use of the H3 lookup caches.
+
+    Returns
+    -------
+    A dict with one entry per cache ("centre", "children", "points" and
+    "raster_indices"), each a dict with keys "hits", "misses", "hit_rate", "size" and
+    "max_size".
+    """
+    info = {}
+
+    for name, fun in _cached_functions.items():
+        stats = fun.cache_info()
+        n_lookups = stats.hits + stats.misses
+
+        info[name] = {
+            "hits": stats.hits,
+            "misses": stats.misses,
+            "hit_rate": stats.hits / n_lookups if n_lookups > 0 else np.nan,
+            "size": stats.currsize,
+            "max_size": stats.maxsize
+        }
+
+    return info
+
+
+def h3_cache_clear():
+    """
+    Empty all H3 lookup caches.
+
+    Returns
+    -------
+    None
+    """
+    for fun in _cached_functions.values():
+        fun.cache_clear()
@@ -1,10 +1,378 @@
 # Functions for calculating least cost distances between hexagons
 
-from rasterio.transform import rowcol
+import os
+from collections import OrderedDict
+from heapq import heappop, heappush
+from math import ceil, hypot, sqrt
+from tempfile import mkstemp
+from time import perf_counter
+from warnings import catch_warnings, simplefilter
+
+import ray
+from ray.util import ActorPool
+from numpy import full as np_full
+from numpy import load as np_load
+from numpy import save as np_save
+from numpy import (arange, argwhere, array, asarray, ascontiguousarray, column_stack, concatenate, 
+                   cumsum, empty, errstate, float32, float64, floor, full_like, inf, intp, 
+                   isfinite, isinf, isnan, maximum, minimum, nan, nanmean, nanmin, unique, 
+                   unravel_index, where)
+from numpy.ma import masked_array
+from numpy.lib.format import open_memmap
+from numpy.random import default_rng
+from pandas import DataFrame, concat
+from scipy.sparse import csr_matrix
+from scipy.ndimage import maximum_filter
+from scipy.sparse.csgraph import dijkstra
 from skimage.graph import MCP_Geometric
-from h3 import h3_get_resolution, h3_to_children, h3_to_geo
+from h3 import h3_get_resolution, k_ring
 
 from .edge_feature import CachedEdgeFeature
+from .h3_cache import h3_centre, h3_children, h3_points, h3_raster_indices
+
+
+def _k_ring_neighbours(node_names, k_distance, symmetric=False):
+    """
+    Build a neighbour table listing, for each node, the indices of all nodes in 
+    `node_names` within `k_distance` steps (including the node itself), padded with -1.
+    
+    When `symmetric` is True, each pair of nodes is listed in only one of their rows, 
+    chosen so that each row lists at most about half of the node's neighbours (see 
+    `_orient_pairs()`), halving the size of the table.
+    """
+    node_index = {name: i for i, name in enumerate(node_names)}
+    rows = [sorted(node_index[n] for n in k_ring(node, k_distance) if n in node_index)
+            for node in node_names]
+    
+    if symmetric:
+        rows = _orient_pairs(rows)
+    
+    neighbours = np_full((len(node_names), max(map(len, rows), default=1)), -1)
+    
+    for i, ring_inds in enumerate(rows):
+        neighbours[i, :len(ring_inds)] = ring_inds
+    
+    return neighbours
+
+
+def _orient_pairs(rows):
+    """
+    Assign each pair of mutual neighbours to one of the two nodes, so that each node is 
+    assigned at most half (rounded up) of its neighbours, plus itself.
+    
+    Pairs are assigned by following closed walks through the neighbour graph, with each 
+    pair assigned to the node the walk leaves from. Every node is entered as often as it 
+    is left once nodes with an odd number of neighbours are linked to an extra node.
+    
+    Parameters
+    ----------
+    rows: A list with one list of neighbour indices per node (with neighbour 
+          relationships mutual).
+    
+    Returns
+    -------
+    A list with one sorted list of assigned neighbour indices per node.
+    """
+    n_nodes = len(rows)
+    adjacent = [[j for j in row if j != i] for i, row in enumerate(rows)]
+    
+    # Link nodes with an odd number of neighbours to an extra node (n_nodes)
+    odd = [i for i in range(n_nodes) if len(adjacent[i]) % 2 == 1]
+    adjacent.append(odd)
+    
+    for i in odd:
+        adjacent[i].append(n_nodes)
+    
+    assigned = [[i] if i in row else [] for i, row in enumerate(rows)]
+    used = set()
+    next_edge = [0] * (n_nodes + 1)
+    
+    for start in range(n_nodes + 1):
+        node = start
+        
+        # With every node having an even number of unused links, walks can only end 
+        # where they started
+        while True:
+            while (next_edge[node] < len(adjacent[node]) and 
+                   frozenset((node, adjacent[node][next_edge[node]])) in used):
+                next_edge[node] += 1
+            
+            if next_edge[node] == len(adjacent[node]):
+                break
+            
+            next_node = adjacent[node][next_edge[node]]
+            used.add(frozenset((node, next_node)))
+            
+            if node < n_nodes and next_node < n_nodes:
+                assigned[node].append(next_node)
+            
+            node = next_node
+    
+    return [sorted(row) for row in assigned]
+
+
+def _h3_row_costs(coordinate_distance, from_hex, to_hexes, resolution):
+    """
+    Get least cost distances from one H3 hexagon to several others using a single 
+    traversal of the cost surface.
+    
+    Parameters
+    ----------
+    coordinate_distance: A `CoordinateLeastCostDistance` object.
+    from_hex: An H3 hexagon identifier.
+    to_hexes: A list of H3 hexagon identifiers.
+    resolution: H3 resolution for calculations (see `LeastCostDistance`).
+    
+    Returns
+    -------
+    A numpy array of costs, one for each hexagon in `to_hexes`.
+    """
+    transform = coordinate_distance.raster_transform
+    from_cells = column_stack(h3_raster_indices(from_hex, resolution, transform))
+    to_cells = [column_stack(h3_raster_indices(h, resolution, transform)) for h in to_hexes]
+    
+    # Flatten destination cells, recording where each hexagon's cells start
+    n_cells = [len(c) for c in to_cells]
+    group_starts = cumsum([0] + n_cells[:-1])
+    to_cells = concatenate(to_cells)
+    
+    costs = coordinate_distance._get_costs_from_cells(from_cells, to_cells)
+    
+    # Minimum across each destination's children
+    return minimum.reduceat(costs, group_starts)
+
+
+def _aggregate_costs(cost_raster, factor, aggregation):
+    """
+    Downsample a cost raster by an integer factor, taking the minimum or mean of the 
+    passable cells in each block (blocks with no passable cells are impassable). Costs are 
+    multiplied by `factor`, so that cumulative costs remain in units of the original cells.
+    """
+    n_rows, n_cols = cost_raster.shape
+    coarse_shape = (-(-n_rows // factor), -(-n_cols // factor))
+    
+    padded = np_full((coarse_shape[0] * factor, coarse_shape[1] * factor), nan)
+    padded[:n_rows, :n_cols] = cost_raster
+    padded[~(isfinite(padded) & (padded >= 0))] = nan
+    blocks = padded.reshape(coarse_shape[0], factor, coarse_shape[1], factor)
+    
+    with errstate(all="ignore"), catch_warnings():
+        simplefilter("ignore", RuntimeWarning)
+        
+        if aggregation == "min":
+            coarse = nanmin(blocks, axis=(1, 3))
+        else:
+            coarse = nanmean(blocks, axis=(1, 3))
+    
+    return where(isnan(coarse), -1, coarse * factor)
+
+
+def _geo_to_cells(raster_transform, points):
+    """
+    Convert (lat, lon) coordinates to an array of (row, col) raster indices, using a 
+    single inversion of the raster transform.
+    """
+    if not hasattr(points, "__len__"):
+        # Iterables such as generators
+        points = list(points)
+    
+    points = asarray(points, dtype=float).reshape(-1, 2)
+    inverse = ~raster_transform
+    cols = inverse.a * points[:, 1] + inverse.b * points[:, 0] + inverse.c
+    rows = inverse.d * points[:, 1] + inverse.e * points[:, 0] + inverse.f
+    
+    return column_stack([floor(rows), floor(cols)]).astype(intp)
+
+
+def _check_cells(cells, shape, description):
+    """
+    Raise an error if any (row, col) indices fall outside a raster of the given shape.
+    """
+    n_rows, n_cols = shape
+    outside = ((cells[:, 0] < 0) | (cells[:, 0] >= n_rows) | 
+               (cells[:, 1] < 0) | (cells[:, 1] >= n_cols))
+    
+    if outside.any():
+        raise ValueError(
+            f"{outside.sum()} {description} point(s) fall outside the cost raster "
+            f"(first at cell {tuple(cells[outside][0].tolist())}; raster shape "
+            f"{(n_rows, n_cols)})."
+        )
+
+
+# (row offset, column offset, step length) of the moves between 8-connected cells
+_NEIGHBOUR_STEPS = [(-1, -1, sqrt(2)), (-1, 0, 1.0), (-1, 1, sqrt(2)), (0, -1, 1.0), 
+                    (0, 1, 1.0), (1, -1, sqrt(2)), (1, 0, 1.0), (1, 1, sqrt(2))]
+
+
+# Maximum number of distinct end cells for A* searches, whose heuristic is evaluated for
+# every end cell in turn
+_ASTAR_MAX_END_CELLS = 8
+
+
+def _astar_costs(cost_raster, xy_from, xy_to, heuristic, max_cost=inf):
+    """
+    Get least costs from a set of start cells to each of several end cells using A* search.
+    
+    Moves are between 8-connected cells, costing the mean of the two cells' costs 
+    multiplied by the distance between their centres (as in `MCP_Geometric`). Negative, 
+    infinite and NaN costs are impassable. Start cells have a cost of 0. As in 
+    `MCP_Geometric`, paths can leave a start cell even if it is impassable, using its 
+    own cost for the first move (unless that cost is infinite or NaN).
+    
+    Parameters
+    ----------
+    cost_raster: An ndarray to use as the cost surface.
+    xy_from: An array of (row, col) start cells.
+    xy_to: An array of (row, col) end cells.
+    heuristic: A function taking (row, col) and returning a lower bound on the cost to the 
+               nearest end cell. This must be consistent (i.e. not decrease by more than 
+               the cost of any move) for results to be exact.
+    max_cost: Costs above this are not searched, and are returned as infinite.
+    
+    Returns
+    -------
+    A numpy array of costs, one for each end cell.
+    """
+    remaining = set(map(tuple, xy_to.tolist()))
+    
+    # Indexing a memoryview is much faster than indexing numpy arrays one cell at a time
+    cost_raster = memoryview(ascontiguousarray(cost_raster, dtype=float64))
+    
+    best = {}
+    settled = set()
+    queue = []
+    
+    start_cells = set(map(tuple, xy_from.tolist()))
+    
+    for cell in start_cells:
+        best[cell] = 0.0
+        settled.add(cell)
+        remaining.discard(cell)
+    
+    # Start cells are settled before searching, with their neighbours queued directly. 
+    # This lets paths leave impassable start cells, whose heuristic may be infinite.
+    for cell in start_cells:
+        _relax_neighbours(cost_raster, cell, 0.0, cost_raster[cell], heuristic, best, 
+                          settled, queue)
+    
+    while queue and remaining:
+        f, g, cell = heappop(queue)
+        
+        if f > max_cost:
+            break
+        
+        if cell in settled:
+            continue
+        
+        settled.add(cell)
+        remaining.discard(cell)
+        
+        # Only passable cells are queued
+        _relax_neighbours(cost_raster, cell, g, cost_raster[cell], heuristic, best, 
+                          settled, queue)
+    
+    costs = array([best.get(cell, inf) if cell in settled else inf 
+                   for cell in map(tuple, xy_to.tolist())])
+    costs[costs > max_cost] = inf
+    
+    return costs
+
+
+def _relax_neighbours(cost_raster, cell, g, cell_cost, heuristic, best, settled, queue):
+    """
+    Queue the passable neighbours of a cell reached at cost `g`, where this improves on 
+    the best known cost to them (see `_astar_costs`).
+    """
+    if not cell_cost < inf:
+        return
+    
+    n_rows, n_cols = cost_raster.shape
+    row, col = cell
+    
+    for row_step, col_step, length in _NEIGHBOUR_STEPS:
+        next_row = row + row_step
+        next_col = col + col_step
+        
+        if not (0 <= next_row < n_rows and 0 <= next_col < n_cols):
+            continue
+        
+        next_cell = (next_row, next_col)
+        next_cost = cost_raster[next_row, next_col]
+        
+        if next_cell in settled or not 0 <= next_cost < inf:
+            continue
+        
+        next_g = g + length * (cell_cost + next_cost) / 2
+        
+        if next_g < best.get(next_cell, inf):
+            best[next_cell] = next_g
+            heappush(queue, (next_g + heuristic(next_row, next_col), next_g, next_cell))
+
+
+def _landmark_bounds(from_costs, to_costs, tolerance):
+    """
+    Get lower and upper bounds on the least costs between cells from their costs to a 
+    set of landmarks, using the triangle inequality (and symmetry of costs).
+    
+    Parameters
+    ----------
+    from_costs: A numpy array of costs from landmarks (first axis) to start cells.
+    to_costs: A numpy array of costs from landmarks to end cells, broadcastable with
+              `from_costs`.
+    tolerance: Relative amount by which bounds are loosened, allowing for rounding of
+               landmark costs.
+    
+    Returns
+    -------
+    A (lower, upper) tuple of numpy arrays, each reduced over landmarks.
+    """
+    from_costs = asarray(from_costs, dtype=float64)
+    to_costs = asarray(to_costs, dtype=float64)
+    from_inf = isinf(from_costs)
+    to_inf = isinf(to_costs)
+    
+    with errstate(invalid="ignore"):
+        lower = abs(to_costs - from_costs) - tolerance * (to_costs + from_costs)
+    
+    # Cells reachable from a landmark can't be reached from cells that aren't, while 
+    # landmarks reaching neither cell give no information
+    lower = where(from_inf != to_inf, inf, where(from_inf, 0, maximum(lower, 0)))
+    upper = (from_costs + to_costs) * (1 + tolerance)
+    
+    return lower.max(axis=0), upper.min(axis=0)
+
+
+@ray.remote
+class _LeastCostWorker(object):
+    """
+    A ray actor holding its own `MCP_Geometric` graph, used to calculate least cost 
+    distances from several origins in parallel (see `LeastCostDistance.precompute_parallel`).
+    
+    `settings` holds keyword arguments for `CoordinateLeastCostDistance`, and landmarks 
+    (if given) are shared with the actor rather than rebuilt.
+    """
+    def __init__(self, cost_raster, raster_transform, resolution, settings, 
+                 landmark_cells=None, landmark_costs=None, landmark_tolerance=0):
+        self.distance = CoordinateLeastCostDistance(cost_raster, raster_transform, **settings)
+        self.distance.landmark_cells = landmark_cells
+        self.distance.landmark_costs = landmark_costs
+        self.distance.landmark_tolerance = landmark_tolerance
+        self.resolution = resolution
+    
+    def compute_rows(self, rows):
+        """
+        Calculate costs for a list of (from_hex, to_hexes) tuples, returning a list of 
+        (from_hex, to_hexes, costs) tuples.
+        """
+        return [(from_hex, to_hexes, _h3_row_costs(self.distance, from_hex, to_hexes, self.resolution))
+                for from_hex, to_hexes in rows]
+    
+    def clear_surface_cache(self):
+        """
+        Discard the actor's cached surfaces, deleting any spilled to disk.
+        """
+        self.distance.clear_surface_cache()
 
 
 class CoordinateLeastCostDistance(object):
@@ -14,21 +382,140 @@ class CoordinateLeastCostDistance(object):
     Note that this class does not cache results for later use, but does avoid traversing
     the same areas of the cost surface by re-using calculations from repeated calls.
     
+    By default each query searches the full cost surface. When `window_padding` or 
+    `max_cost` are given, the search is instead restricted to a window around the start 
+    and end points:
+    - With `window_padding`, the window extends this many cells beyond the start and end
+      points. If a cheaper path could leave the window (i.e. if any cost found is more
+      than that of travelling to the edge of the window and back at the lowest cost in
+      `cost_raster`), the padding is doubled and the search repeated.
+    - With `max_cost`, the window is made large enough to contain all paths costing up to
+      `max_cost`, and higher costs are returned as infinite.
+    
+    With `search="pyramid"`, costs are approximated using a coarse-to-fine search. The cost 
+    surface is first downsampled by `pyramid_factor` (taking the minimum or mean cost of 
+    each block of cells), and searched from both the start and end points. Only the 
+    corridor of coarse cells lying on paths costing up to (1 + `pyramid_tolerance`) times 
+    the coarse least cost (expanded by one coarse cell) is then searched at full 
+    resolution. Costs are never lower than those from a full search, and are equal 
+    whenever the least cost path lies within the corridor: larger tolerances give wider 
+    corridors, which are slower to search but less likely to miss the least cost path 
+    (the tolerance applies to coarse costs, so does not bound the error directly). End 
+    points not reachable within the corridor are found using a full search. 
+    `window_padding` and the surface cache are not used by pyramid searches.
+    
+    After calling `build_landmarks()`, the costs from a set of landmark cells to all other 
+    cells are used to bound costs between any two cells (ALT bounds). These bounds 
+    exclude end points that must cost more than `max_cost` from searches, and can answer 
+    threshold queries (`exceeds_cost()`) without searching.
+    
+    With `search="astar"`, queries with landmarks and at most 8 distinct end cells are 
+    instead answered using A* search, guided towards the end points by the landmark lower 
+    bounds. This gives the same costs as the default search (for cost surfaces without NaN 
+    values, which `MCP_Geometric` does not handle), and explores far fewer cells. However, 
+    it is implemented in pure Python, which is around 10 times slower per cell than 
+    `MCP_Geometric`, so it is only faster for long paths (e.g. 0.06 s against 0.12 s for a 
+    path of 300 cells on a 1000 x 1000 raster with 8 landmarks, but 0.02 s against 0.013 s 
+    for 100 cells). 
+    Other queries (including all queries before landmarks are built) use the default 
+    search. `window_padding` and the surface cache are not used by A* searches, while 
+    `max_cost` limits the search.
+    
+    Full-surface searches can also keep the cumulative cost surfaces of recent sets of 
+    start cells, so that repeated queries from the same start points only look up costs. 
+    Up to `surface_cache_bytes` of surfaces are held in memory, least recently used first 
+    to be evicted. Evicted surfaces are written to memory-mapped files in `spill_dir` if 
+    given (and kept until `clear_surface_cache()` is called), or discarded otherwise. 
+    Cached surfaces are complete traversals of the cost surface, so the first query from 
+    new start points may be slower than an uncached query.
+    
     Methods
     -------
     get_costs_from_geo(start_points, end_points)
         Get least cost distances between a set of possible start and end points.
+    surface_cache_info()
+        Summarise use of the cumulative cost surface cache.
+    clear_surface_cache()
+        Discard all cached cumulative cost surfaces.
+    build_landmarks(n_landmarks, directory=None, seed=None, tolerance=1e-6)
+        Select landmark cells and calculate costs from them to all cells.
+    load_landmarks(directory, tolerance=1e-6)
+        Load landmarks previously built in a directory.
+    cost_bounds(start_points, end_points)
+        Get lower and upper bounds on least costs using landmarks.
+    exceeds_cost(start_points, end_points, threshold, exact=True)
+        Find which least costs are above a threshold, using landmark bounds where possible.
     """
-    def __init__(self, cost_raster, raster_transform):
+    def __init__(self, cost_raster, raster_transform, window_padding=None, max_cost=None,
+                 surface_cache_bytes=0, spill_dir=None, search="dijkstra", pyramid_factor=8,
+                 pyramid_aggregation="min", pyramid_tolerance=0.05):
         """
         Parameters
         ----------
         cost_raster: An ndarray to use as the cost surface.
         raster_transform: `rasterio` coefficients mapping pixel coordinates to the coordinate 
                            reference system in `cost_raster`.
+        window_padding: Optional number of cells by which to pad the search window around
+                        start and end points (default: None, i.e. search the full surface).
+        max_cost: Optional cost above which paths are not considered (default: None).
+        surface_cache_bytes: Maximum memory used to cache cumulative cost surfaces (default:
+                             0, i.e. surfaces are not cached unless `spill_dir` is given).
+        spill_dir: Optional directory in which to store cached surfaces evicted from memory 
+                   as memory-mapped ".npy" files (default: None).
+        search: One of "dijkstra" (search outwards from start points using `MCP_Geometric`; 
+                the default), "astar" (A* search towards a few end points using 
+                landmarks, only faster for long paths; see above) or "pyramid" 
+                (coarse-to-fine search; see above).
+        pyramid_factor: Number of cells along each side of the blocks aggregated for 
+                        pyramid searches (default: 8).
+        pyramid_aggregation: Either "min" or "mean", the summary of costs within each 
+                             block for pyramid searches (default: "min").
+        pyramid_tolerance: Relative amount by which paths through the corridor searched 
+                           at full resolution may exceed the coarse least cost (default: 
+                           0.05).
         """
+        if window_padding is not None and window_padding < 1:
+            raise ValueError("window_padding must be >= 1.")
+        
+        if search not in ("dijkstra", "astar", "pyramid"):
+            raise ValueError('search must be one of "dijkstra", "astar" or "pyramid".')
+        
+        if pyramid_factor < 2:
+            raise ValueError("pyramid_factor must be >= 2.")
+        
+        if pyramid_aggregation not in ("min", "mean"):
+            raise ValueError('pyramid_aggregation must be either "min" or "mean".')
+        
         self.mcp = MCP_Geometric(cost_raster, fully_connected=True)
         self.raster_transform = raster_transform
+        self.cost_raster = cost_raster
+        self.window_padding = window_padding
+        self.max_cost = max_cost
+        self.search = search
+        self.pyramid_factor = pyramid_factor
+        self.pyramid_aggregation = pyramid_aggregation
+        self.pyramid_tolerance = pyramid_tolerance
+        self.coarse_mcp = None
+        
+        if search == "pyramid":
+            coarse_costs = _aggregate_costs(cost_raster, pyramid_factor, pyramid_aggregation)
+            self.coarse_mcp = MCP_Geometric(coarse_costs, fully_connected=True)
+        
+        self.surface_cache_bytes = surface_cache_bytes
+        self.spill_dir = spill_dir
+        self._surfaces = OrderedDict()
+        self._spilled_surfaces = OrderedDict()
+        self._surface_memory = 0
+        self.n_surface_hits = 0
+        self.n_surface_misses = 0
+        
+        self.landmark_cells = None
+        self.landmark_costs = None
+        self.landmark_tolerance = 0
+        
+        # Negative and infinite costs are impassable
+        passable = cost_raster[isfinite(cost_raster) & (cost_raster >= 0)]
+        self.min_cost = passable.min() if passable.size > 0 else 0
     
     def get_costs_from_geo(self, start_points, end_points):
         """
@@ -36,27 +523,554 @@ class CoordinateLeastCostDistance(object):
         
         Parameters
         ----------
-        start_points: An iterable of starting coordinates, with each coordinate a (lat, lon) tuple.
-        end_points: An iterable of end coordinates.
+        start_points: An iterable of starting coordinates, with each coordinate a (lat, lon) 
+                      tuple, or a numpy array with one (lat, lon) row per coordinate.
+        end_points: An iterable of end coordinates (as for `start_points`).
         
         Returns
         -------
         A numpy array of costs, corresponding to each end point (and using the nearest/cheapest 
         start point).
         """
-        xy_from = (rowcol(self.raster_transform, c[1], c[0]) for c in start_points)
-        xy_to = [rowcol(self.raster_transform, c[1], c[0]) for c in end_points]
+        xy_from = self._geo_to_cells(start_points)
+        xy_to = self._geo_to_cells(end_points)
 
-        cumulative_cost, _ = self.mcp.find_costs(xy_from, xy_to)
+        return self._get_costs_from_cells(xy_from, xy_to)
+    
+    def _geo_to_cells(self, points):
+        return _geo_to_cells(self.raster_transform, points)
+    
+    def _check_cells(self, cells, description):
+        _check_cells(cells, self.cost_raster.shape, description)
+    
+    def _get_costs_from_cells(self, xy_from, xy_to):
+        """
+        Get least costs between raster cells, with start and end cells given as arrays of
+        (row, col) indices.
+        """
+        self._check_cells(xy_from, "start")
+        self._check_cells(xy_to, "end")
+        
+        if self.landmark_costs is not None and self.max_cost is not None:
+            # Only search for end points which could cost less than max_cost
+            lower, _ = self._cell_bounds(xy_from, xy_to)
+            searched = lower <= self.max_cost
+            
+            end_costs = np_full(len(xy_to), inf)
+            
+            if searched.any():
+                end_costs[searched] = self._search_costs(xy_from, xy_to[searched])
+            
+            return end_costs
+        
+        return self._search_costs(xy_from, xy_to)
+    
+    def _search_costs(self, xy_from, xy_to):
+        """
+        Get least costs between raster cells by searching the cost surface.
+        """
+        if self.search == "astar" and self._uses_astar(xy_to):
+            max_cost = inf if self.max_cost is None else self.max_cost
+            heuristic = self._landmark_heuristic(xy_to)
+            
+            return _astar_costs(self.cost_raster, xy_from, xy_to, heuristic, max_cost=max_cost)
+        
+        if self.search == "pyramid":
+            end_costs = self._get_pyramid_costs(xy_from, xy_to)
+            
+            if self.max_cost is not None:
+                end_costs[end_costs > self.max_cost] = inf
+            
+            return end_costs
+        
+        if self.window_padding is not None or self.max_cost is not None:
+            return self._get_windowed_costs(xy_from, xy_to)
+
+        if self._caches_surfaces():
+            cumulative_cost = self._get_surface(xy_from)
+        else:
+            cumulative_cost, _ = self.mcp.find_costs(xy_from, xy_to)
 
-        # Unpack [(x1, y1), (x2, y2), ...] into (x_inds, y_inds)
-        end_inds = tuple(zip(*xy_to))
+        # Unpack [(row1, col1), (row2, col2), ...] into (rows, cols)
+        end_inds = tuple(xy_to.T)
 
         # Since costs are cumulative, only need to keep values for the end points
         end_costs = cumulative_cost[end_inds]
 
         return end_costs
     
+    def _uses_astar(self, xy_to):
+        """
+        Whether A* search is used to find costs to a set of end cells (see class 
+        documentation).
+        """
+        return (self.landmark_costs is not None and 
+                len(unique(xy_to, axis=0)) <= _ASTAR_MAX_END_CELLS)
+    
+    def _caches_surfaces(self):
+        """
+        Whether cumulative cost surfaces are cached.
+        """
+        return self.surface_cache_bytes > 0 or self.spill_dir is not None
+    
+    def _get_surface(self, xy_from):
+        """
+        Get the cumulative cost surface from a set of start cells, from the cache if 
+        possible.
+        """
+        # Surfaces depend only on the set of start cells, not their order or repetition
+        key = unique(xy_from, axis=0).tobytes()
+        
+        for surfaces in (self._surfaces, self._spilled_surfaces):
+            if key in surfaces:
+                surfaces.move_to_end(key)
+                self.n_surface_hits += 1
+                return surfaces[key]
+        
+        self.n_surface_misses += 1
+        
+        # Traverse the whole surface (given end cells, MCP would stop early), copying the result
+        # since MCP re-uses its output array
+        cumulative_cost, _ = self.mcp.find_costs(xy_from)
+        cumulative_cost = cumulative_cost.copy()
+        
+        self._surfaces[key] = cumulative_cost
+        self._surface_memory += cumulative_cost.nbytes
+        
+        # Evict least recently used surfaces until within budget
+        while self._surface_memory > self.surface_cache_bytes:
+            old_key, old_surface = self._surfaces.popitem(last=False)
+            self._surface_memory -= old_surface.nbytes
+            
+            if self.spill_dir is not None:
+                self._spilled_surfaces[old_key] = self._spill_surface(old_surface)
+        
+        return cumulative_cost
+    
+    def _spill_surface(self, surface):
+        """
+        Write a cumulative cost surface to a ".npy" file in `spill_dir`, returning a 
+        read-only memory map of it.
+        """
+        handle, filename = mkstemp(suffix=".npy", dir=self.spill_dir)
+        os.close(handle)
+        
+        spilled = open_memmap(filename, mode="w+", dtype=surface.dtype, shape=surface.shape)
+        spilled[:] = surface
+        spilled.flush()
+        del spilled
+        
+        return open_memmap(filename, mode="r")
+    
+    def surface_cache_info(self):
+        """
+        Summarise use of the cumulative cost surface cache.
+        
+        Returns
+        -------
+        A dict with keys "hits", "misses", "hit_rate", "n_in_memory", "memory_bytes" and 
+        "n_spilled".
+        """
+        n_lookups = self.n_surface_hits + self.n_surface_misses
+        hit_rate = self.n_surface_hits / n_lookups if n_lookups > 0 else nan
+        
+        return {
+            "hits": self.n_surface_hits,
+            "misses": self.n_surface_misses,
+            "hit_rate": hit_rate,
+            "n_in_memory": len(self._surfaces),
+            "memory_bytes": self._surface_memory,
+            "n_spilled": len(self._spilled_surfaces)
+        }
+    
+    def clear_surface_cache(self):
+        """
+        Discard all cached cumulative cost surfaces, deleting any spilled to disk.
+        
+        Returns
+        -------
+        None
+        """
+        for surface in self._spilled_surfaces.values():
+            filename = surface.filename
+            del surface
+            os.remove(filename)
+        
+        self._surfaces.clear()
+        self._spilled_surfaces.clear()
+        self._surface_memory = 0
+    
+    def build_landmarks(self, n_landmarks, directory=None, seed=None, tolerance=1e-6):
+        """
+        Select landmark cells spread across the cost surface, and calculate the least 
+        costs from each to every cell.
+        
+        Landmarks are chosen by farthest-point selection: starting from a random passable 
+        cell, each new landmark is the reachable cell with the highest cost from the 
+        nearest landmark already chosen. Costs are stored as float32, in memory or in a 
+        memory-mapped file, so that bounds are loosened slightly (by `tolerance`).
+        
+        Parameters
+        ----------
+        n_landmarks: Number of landmarks to select.
+        directory: Optional directory in which to store landmark costs ("landmark_costs.npy")
+                   and cells ("landmark_cells.npy"), for later use with `load_landmarks()` 
+                   (default: None, i.e. keep in memory).
+        seed: Optional seed for the random number generator used to choose the first cell.
+        tolerance: Relative amount by which landmark bounds are loosened, allowing for 
+                   rounding of stored costs (default: 1e-6).
+        
+        Returns
+        -------
+        None
+        """
+        if n_landmarks < 1:
+            raise ValueError("n_landmarks must be >= 1.")
+        
+        passable = isfinite(self.cost_raster) & (self.cost_raster >= 0)
+        
+        if not passable.any():
+            raise ValueError("cost_raster contains no passable cells.")
+        
+        shape = (n_landmarks, *self.cost_raster.shape)
+        
+        if directory is None:
+            landmark_costs = empty(shape, dtype=float32)
+        else:
+            landmark_costs = open_memmap(os.path.join(directory, "landmark_costs.npy"), 
+                                         mode="w+", dtype=float32, shape=shape)
+        
+        rng = default_rng(seed)
+        passable_cells = argwhere(passable)
+        cell = passable_cells[rng.integers(len(passable_cells))]
+        
+        # Cost from the nearest landmark (initially, from the random starting cell)
+        nearest_costs, _ = self.mcp.find_costs([cell])
+        nearest_costs = nearest_costs.copy()
+        landmark_cells = []
+        
+        for i in range(n_landmarks):
+            reachable_costs = where(isfinite(nearest_costs), nearest_costs, -1)
+            cell = unravel_index(reachable_costs.argmax(), reachable_costs.shape)
+            landmark_cells.append(cell)
+            
+            costs, _ = self.mcp.find_costs([cell])
+            landmark_costs[i] = costs
+            nearest_costs = minimum(nearest_costs, costs) if i > 0 else costs.copy()
+        
+        landmark_cells = array(landmark_cells)
+        
+        if directory is not None:
+            landmark_costs.flush()
+            np_save(os.path.join(directory, "landmark_cells.npy"), landmark_cells)
+        
+        self.landmark_cells = landmark_cells
+        self.landmark_costs = landmark_costs
+        self.landmark_tolerance = tolerance
+    
+    def load_landmarks(self, directory, tolerance=1e-6):
+        """
+        Load landmarks created by `build_landmarks()`, memory-mapping their costs.
+        
+        Parameters
+        ----------
+        directory: The directory passed to `build_landmarks()`.
+        tolerance: Relative amount by which landmark bounds are loosened (default: 1e-6).
+        
+        Returns
+        -------
+        None
+        """
+        landmark_costs = open_memmap(os.path.join(directory, "landmark_costs.npy"), mode="r")
+        
+        if landmark_costs.shape[1:] != self.cost_raster.shape:
+            raise ValueError(
+                f"Landmark costs have shape {landmark_costs.shape[1:]}, but cost_raster has "
+                f"shape {self.cost_raster.shape}."
+            )
+        
+        self.landmark_cells = np_load(os.path.join(directory, "landmark_cells.npy"))
+        self.landmark_costs = landmark_costs
+        self.landmark_tolerance = tolerance
+    
+    def _cell_bounds(self, xy_from, xy_to):
+        """
+        Get lower and upper bounds on the least cost to each end cell (from the cheapest 
+        start cell) using landmarks.
+        
+        Bounds are found for blocks of start cells at a time, limiting the size of the
+        (landmark, start cell, end cell) arrays compared to about 4 million values.
+        """
+        n_landmarks = self.landmark_costs.shape[0]
+        to_costs = self.landmark_costs[:, xy_to[:, 0], xy_to[:, 1]][:, None, :]
+        block_size = max(2 ** 22 // (n_landmarks * len(xy_to)), 1)
+        
+        lower = np_full(len(xy_to), inf)
+        upper = np_full(len(xy_to), inf)
+        
+        for i in range(0, len(xy_from), block_size):
+            block = xy_from[i:(i + block_size)]
+            from_costs = self.landmark_costs[:, block[:, 0], block[:, 1]][:, :, None]
+            
+            # Bounds for each pair of cells
+            block_lower, block_upper = _landmark_bounds(from_costs, to_costs, 
+                                                        self.landmark_tolerance)
+            
+            # Landmarks can't reach impassable start cells, so give no information about 
+            # them (and moves out of start cells with negative costs can cost less than 0)
+            start_costs = self.cost_raster[block[:, 0], block[:, 1]]
+            impassable = ~(isfinite(start_costs) & (start_costs >= 0))
+            block_lower[impassable] = where(start_costs[impassable] < 0, -inf, 0)[:, None]
+            block_upper[impassable] = inf
+            
+            # The least cost uses the cheapest start cell
+            lower = minimum(lower, block_lower.min(axis=0))
+            upper = minimum(upper, block_upper.min(axis=0))
+        
+        return lower, upper
+    
+    def _landmark_heuristic(self, xy_to):
+        """
+        Create an A* heuristic giving a lower bound on the cost from a cell to the nearest 
+        end cell, using the larger of the landmark and straight-line bounds (as in 
+        `_landmark_bounds()`, but evaluated one cell at a time in pure Python, which is 
+        faster for small numbers of landmarks and end cells).
+        """
+        xy_to = unique(xy_to, axis=0)
+        n_landmarks = self.landmark_costs.shape[0]
+        landmark_costs = memoryview(ascontiguousarray(self.landmark_costs))
+        tolerance = self.landmark_tolerance
+        min_cost = self.min_cost
+        
+        targets = [(row, col, [landmark_costs[i, row, col] for i in range(n_landmarks)])
+                   for row, col in xy_to.tolist()]
+        
+        # Cells are usually reached from several neighbours, so remember bounds
+        bounds = {}
+        
+        def heuristic(row, col):
+            if (row, col) in bounds:
+                return bounds[row, col]
+            
+            from_costs = [landmark_costs[i, row, col] for i in range(n_landmarks)]
+            nearest = inf
+            
+            for target_row, target_col, to_costs in targets:
+                bound = min_cost * hypot(row - target_row, col - target_col)
+                
+                for from_cost, to_cost in zip(from_costs, to_costs):
+                    if from_cost == inf or to_cost == inf:
+                        if from_cost != to_cost:
+                            # Reachable from the landmark, but the cell is not
+                            bound = inf
+                            break
+                    else:
+                        bound = max(bound, abs(to_cost - from_cost) 
+                                    - tolerance * (to_cost + from_cost))
+                
+                nearest = min(nearest, bound)
+            
+            bounds[row, col] = nearest
+            return nearest
+        
+        return heuristic
+    
+    def _require_landmarks(self):
+        if self.landmark_costs is None:
+            raise ValueError("No landmarks available: call build_landmarks() first.")
+    
+    def cost_bounds(self, start_points, end_points):
+        """
+        Get lower and upper bounds on the least cost paths between a set of possible start 
+        and end points, using landmarks (see `build_landmarks()`) rather than searching.
+        
+        Parameters
+        ----------
+        start_points: Starting coordinates (see `get_costs_from_geo()`).
+        end_points: End coordinates.
+        
+        Returns
+        -------
+        A (lower, upper) tuple of numpy arrays, each with one bound for each end point.
+        """
+        self._require_landmarks()
+        
+        xy_from = self._geo_to_cells(start_points)
+        xy_to = self._geo_to_cells(end_points)
+        self._check_cells(xy_from, "start")
+        self._check_cells(xy_to, "end")
+        
+        return self._cell_bounds(xy_from, xy_to)
+    
+    def exceeds_cost(self, start_points, end_points, threshold, exact=True):
+        """
+        Find whether the least cost to each end point is above a threshold, using landmark 
+        bounds (see `build_landmarks()`) where these are sufficient.
+        
+        Parameters
+        ----------
+        start_points: Starting coordinates (see `get_costs_from_geo()`).
+        end_points: End coordinates.
+        threshold: Cost threshold.
+        exact: Whether to search the cost surface for end points where bounds are not
+               sufficient (default: True).
+        
+        Returns
+        -------
+        A boolean numpy array, one value for each end point. When `exact` is False, this 
+        is a masked array, with undecided values masked.
+        """
+        self._require_landmarks()
+        
+        xy_from = self._geo_to_cells(start_points)
+        xy_to = self._geo_to_cells(end_points)
+        self._check_cells(xy_from, "start")
+        self._check_cells(xy_to, "end")
+        
+        lower, upper = self._cell_bounds(xy_from, xy_to)
+        exceeds = lower > threshold
+        undecided = ~exceeds & (upper > threshold)
+        
+        if not exact:
+            return masked_array(exceeds, mask=undecided)
+        
+        if undecided.any():
+            exceeds[undecided] = self._search_costs(xy_from, xy_to[undecided]) > threshold
+        
+        return exceeds
+    
+    def _get_pyramid_costs(self, xy_from, xy_to):
+        """
+        Get least costs between raster cells using a coarse-to-fine search (see class 
+        documentation).
+        """
+        factor = self.pyramid_factor
+        coarse_from = xy_from // factor
+        coarse_to = xy_to // factor
+        
+        # Coarse costs from the start points, and to the nearest end point (copying, since 
+        # MCP re-uses its output array)
+        from_costs, _ = self.coarse_mcp.find_costs(coarse_from)
+        from_costs = from_costs.copy()
+        to_costs, _ = self.coarse_mcp.find_costs(coarse_to)
+        
+        end_costs = from_costs[tuple(coarse_to.T)]
+        end_costs = end_costs[isfinite(end_costs)]
+        
+        if len(end_costs) == 0:
+            return self._get_full_costs(xy_from, xy_to)
+        
+        with errstate(invalid="ignore"):
+            corridor = from_costs + to_costs <= (1 + self.pyramid_tolerance) * end_costs.max()
+        
+        corridor[tuple(coarse_from.T)] = True
+        corridor[tuple(coarse_to.T)] = True
+        corridor = maximum_filter(corridor, size=3)
+        
+        # Search the bounding box of the corridor at full resolution, with cells outside 
+        # the corridor impassable
+        coarse_rows, coarse_cols = corridor.nonzero()
+        row_start = coarse_rows.min() * factor
+        row_end = min((coarse_rows.max() + 1) * factor, self.cost_raster.shape[0])
+        col_start = coarse_cols.min() * factor
+        col_end = min((coarse_cols.max() + 1) * factor, self.cost_raster.shape[1])
+        offset = array([row_start, col_start])
+        
+        inside = corridor[coarse_rows.min():(coarse_rows.max() + 1), 
+                          coarse_cols.min():(coarse_cols.max() + 1)]
+        inside = inside.repeat(factor, axis=0).repeat(factor, axis=1)
+        inside = inside[:(row_end - row_start), :(col_end - col_start)]
+        
+        window = array(self.cost_raster[row_start:row_end, col_start:col_end], dtype=float64)
+        window[~inside] = -1
+        
+        mcp = MCP_Geometric(window, fully_connected=True)
+        cumulative_cost, _ = mcp.find_costs(xy_from - offset, xy_to - offset)
+        costs = array(cumulative_cost[tuple((xy_to - offset).T)])
+        
+        # Fall back to a full search for end points the corridor doesn't connect
+        missing = ~isfinite(costs)
+        
+        if missing.any():
+            costs[missing] = self._get_full_costs(xy_from, xy_to[missing])
+        
+        return costs
+    
+    def _get_full_costs(self, xy_from, xy_to):
+        """
+        Get least costs between raster cells by searching the full cost surface.
+        """
+        cumulative_cost, _ = self.mcp.find_costs(xy_from, xy_to)
+        
+        return array(cumulative_cost[tuple(xy_to.T)])
+    
+    def _first_move_cost(self, xy_from):
+        """
+        Get a lower bound on the cost of the first move out of any of the start cells, 
+        which is negative for start cells with negative costs (and 0 otherwise).
+        """
+        start_costs = self.cost_raster[xy_from[:, 0], xy_from[:, 1]]
+        start_costs = start_costs[isfinite(start_costs)]
+        
+        if start_costs.size == 0:
+            return 0
+        
+        # Diagonal moves are longest, so cost least when the mean cost is negative
+        return min(sqrt(2) * (start_costs.min() + self.min_cost) / 2, 0)
+    
+    def _get_windowed_costs(self, xy_from, xy_to):
+        """
+        Get least costs between raster cells, searching only a window of the cost surface
+        (see class documentation).
+        """
+        n_rows, n_cols = self.cost_raster.shape
+        
+        # Bounding box of all start and end cells
+        all_cells = concatenate([xy_from, xy_to])
+        row_min, col_min = all_cells.min(axis=0)
+        row_max, col_max = all_cells.max(axis=0)
+        
+        # Moves out of start cells with negative costs can cost less than zero
+        first_move = self._first_move_cost(xy_from)
+        
+        if self.max_cost is not None and self.min_cost > 0:
+            # No path costing less than max_cost can travel further than this from its start
+            padding = ceil((self.max_cost - first_move) / self.min_cost) + 1
+        elif self.window_padding is not None and self.min_cost > 0:
+            padding = self.window_padding
+        else:
+            # Window size can't be bounded: search the whole surface
+            padding = max(n_rows, n_cols)
+        
+        while True:
+            row_start = max(row_min - padding, 0)
+            row_end = min(row_max + padding + 1, n_rows)
+            col_start = max(col_min - padding, 0)
+            col_end = min(col_max + padding + 1, n_cols)
+            offset = array([row_start, col_start])
+            
+            window = self.cost_raster[row_start:row_end, col_start:col_end]
+            mcp = MCP_Geometric(window, fully_connected=True)
+            
+            cumulative_cost, _ = mcp.find_costs(xy_from - offset, xy_to - offset)
+            end_costs = cumulative_cost[tuple((xy_to - offset).T)]
+            
+            is_full_surface = window.shape == self.cost_raster.shape
+            
+            # Any path leaving the window must travel more than `padding` cells out of the 
+            # bounding box and back again, with only its first move leaving a start cell
+            exit_cost = 2 * padding * self.min_cost + first_move
+            
+            if is_full_surface or self.max_cost is not None or end_costs.max() <= exit_cost:
+                break
+            
+            padding *= 2
+        
+        if self.max_cost is not None:
+            end_costs[end_costs > self.max_cost] = inf
+        
+        return end_costs
+    
 
 class LeastCostDistance(CachedEdgeFeature, CoordinateLeastCostDistance):
     """
@@ -68,17 +1082,53 @@ class LeastCostDistance(CachedEdgeFeature, CoordinateLeastCostDistance):
     hexagons. If resolution is finer, the mimimum of all costs between centres of child 
     hexagons occuring within the two parents is returned instead.
     
+    When `sparse` is True, only distances between hexagons within `k_distance` steps of 
+    each other are stored.
+    
+    Since a single traversal of the cost surface from one hexagon finds costs to all other 
+    hexagons, distances requested through `get_many()` are calculated one origin at a 
+    time. Use `compute_row()` or `precompute_all()` to fill the data store efficiently.
+    
+    With `method="hex_graph"`, the cost surface is only searched once, to find the least 
+    cost between each hexagon at `resolution` (i.e. the children of hexagons in 
+    `node_names` when `resolution` is finer) and its immediate neighbours (using small 
+    windows of the cost surface). Distances are then shortest paths through this graph of 
+    neighbouring hexagons, found using Dijkstra's algorithm, from the cheapest child of 
+    the origin to the cheapest child of the destination. This is much faster for large 
+    sets of hexagons, but approximate: paths must pass through hexagons in `node_names`, 
+    and are forced through the centres of hexagons at `resolution`, so distances are 
+    never smaller than those from the full cost surface (finer resolutions give closer 
+    distances, but larger graphs). Use `compare_hex_graph()` to assess the difference.
+    
     Methods
     -------
     get(from_node, to_node)
         Retreive a distance, calculating it if needed.
+    get_many(from_nodes, to_nodes)
+        Retreive distances for several pairs of nodes, calculating them if needed.
+    compute_row(from_node, to_nodes=None)
+        Calculate distances from one node to many others.
+    precompute_all()
+        Calculate distances between all nodes.
+    precompute_parallel(n_workers=None)
+        Calculate distances between all nodes using several ray actors.
+    precompute_k_ring()
+        Calculate distances between all nodes within `k_distance` steps of each other.
+    build_hex_graph()
+        Calculate least costs between neighbouring hexagons (`method="hex_graph"`).
+    compare_hex_graph(n_origins=10, seed=None)
+        Compare hex graph distances to those from the full cost surface.
     save(filename):
         Save a record of previously-calculated values to disk in numpy's ".npy" format.
     restore(filename)
         Restore a previously-saved set of values from disk.
     """
     
-    def __init__(self, node_names, cost_raster, raster_transform, resolution, k_distance=1):
+    def __init__(self, node_names, cost_raster, raster_transform, resolution, k_distance=1,
+                 cache_file=None, symmetric=False, sparse=False, window_padding=None, 
+                 max_cost=None, surface_cache_bytes=0, spill_dir=None, search="dijkstra",
+                 method="raster", hex_window_padding=10, pyramid_factor=8, 
+                 pyramid_aggregation="min", pyramid_tolerance=0.05):
         """      
         Parameters
         ----------
@@ -89,9 +1139,48 @@ class LeastCostDistance(CachedEdgeFeature, CoordinateLeastCostDistance):
         resolution: H3 resolution for calculations.
         k_distance: Number of neighbours for which distances will be required (can be used to 
                     reduce redundant calculations; default: 1).
+        cache_file: Optional path to a ".npy" file used to store values on disk rather 
+                    than in memory (see `CachedEdgeFeature`).
+        symmetric: Whether to store only one value for each pair of nodes, halving memory 
+                   use and the number of calculations. Costs between passable cells are 
+                   symmetric up to floating point error, but paths can leave impassable 
+                   (e.g. negative or infinite cost) start cells without being able to enter 
+                   them, so costs to and from hexagons whose cells are impassable differ 
+                   (e.g. finite in one direction and infinite in the other). Only the 
+                   direction calculated first is then stored, so only use this when all 
+                   hexagons' cells are passable (default: False).
+        sparse: Whether to only store distances between nodes within `k_distance` steps of 
+                each other, so that memory use scales with the number of nodes rather than 
+                its square. Other distances are still calculated when requested, but not
+                stored (default: False).
+        window_padding: Optional number of cells by which to pad the search window around
+                        hexagons (see `CoordinateLeastCostDistance`; default: None).
+        max_cost: Optional cost above which paths are not considered, and distances are
+                  returned as infinite (see `CoordinateLeastCostDistance`; default: None).
+        surface_cache_bytes: Maximum memory used to cache cumulative cost surfaces from 
+                             each origin (see `CoordinateLeastCostDistance`; default: 0).
+        spill_dir: Optional directory for cached surfaces evicted from memory (see 
+                   `CoordinateLeastCostDistance`; default: None).
+        search: One of "dijkstra", "astar" or "pyramid" (see 
+                `CoordinateLeastCostDistance`; default: "dijkstra").
+        method: Either "raster" (search the cost surface for each origin; the default) or 
+                "hex_graph" (find shortest paths between neighbouring hexagons; see above).
+        hex_window_padding: Initial number of cells by which to pad the window searched 
+                            for each hexagon's neighbours when `method="hex_graph"` (the
+                            window is enlarged when needed; default: 10).
+        pyramid_factor: Number of cells along each side of the blocks aggregated for 
+                        pyramid searches (see `CoordinateLeastCostDistance`; default: 8).
+        pyramid_aggregation: Either "min" or "mean", the summary of costs within each 
+                             block for pyramid searches (default: "min").
+        pyramid_tolerance: Relative amount by which paths through the corridor searched 
+                           at full resolution may exceed the coarse least cost (see 
+                           `CoordinateLeastCostDistance`; default: 0.05).
         """
         base_resolution = h3_get_resolution(node_names[0])
 
+        if method not in ("raster", "hex_graph"):
+            raise ValueError('method must be either "raster" or "hex_graph".')
+
         if resolution < base_resolution:
             m = f"Resolution must be at least as fine as that of from_hex (i.e., >= {base_resolution})."
             raise ValueError(m)
@@ -99,14 +1188,325 @@ class LeastCostDistance(CachedEdgeFeature, CoordinateLeastCostDistance):
         if k_distance < 1:
             raise ValueError("k_distance must be >= 1.")
 
-        super().__init__(node_names)
+        neighbours = _k_ring_neighbours(node_names, k_distance, symmetric) if sparse else None
+
+        super().__init__(node_names, cache_file=cache_file, symmetric=symmetric, 
+                         neighbours=neighbours)
         
-        self.mcp = MCP_Geometric(cost_raster, fully_connected=True)
+        CoordinateLeastCostDistance.__init__(self, cost_raster, raster_transform, 
+                                             window_padding=window_padding, max_cost=max_cost,
+                                             surface_cache_bytes=surface_cache_bytes,
+                                             spill_dir=spill_dir, search=search,
+                                             pyramid_factor=pyramid_factor,
+                                             pyramid_aggregation=pyramid_aggregation,
+                                             pyramid_tolerance=pyramid_tolerance)
         
-        self.raster_transform = raster_transform
         self.resolution = resolution
         self.base_resolution = base_resolution
         self.k_distance = k_distance
+        self.method = method
+        self.hex_window_padding = hex_window_padding
+        self.hex_graph = None
+        self.hex_graph_nodes = None
+        self._hex_graph_starts = None
+        self.hex_graph_build_time = None
+
+    def precompute_k_ring(self):
+        """
+        Calculate and store distances between all pairs of nodes within `k_distance` steps 
+        of each other, skipping any which are already stored.
+        
+        Returns
+        -------
+        None
+        """
+        neighbours = self.neighbours
+        
+        if neighbours is None:
+            neighbours = _k_ring_neighbours(self.node_names, self.k_distance)
+        
+        for from_ind, from_node in enumerate(self.node_names):
+            to_inds = self._row_targets(from_ind, neighbours)
+            self.get_many(from_node, [self.node_names[i] for i in to_inds])
+    
+    def compute_row(self, from_node, to_nodes=None):
+        """
+        Retreive distances from one node to many others, calculating any which are not 
+        yet stored using a single traversal of the cost surface.
+        
+        Parameters
+        ----------
+        from_node: An origin node identifier present in `node_names`.
+        to_nodes: An iterable of destination node identifiers (default: all nodes, or all
+                  nodes within `k_distance` steps when `sparse` is True).
+        
+        Returns
+        -------
+        A numpy array of distances, one for each destination.
+        """
+        if to_nodes is None:
+            if self.neighbours is None:
+                to_nodes = self.node_names
+            else:
+                to_nodes = sorted((n for n in k_ring(from_node, self.k_distance) 
+                                   if n in self.node_index), key=self.node_index.get)
+        
+        return self.get_many(from_node, to_nodes)
+    
+    def precompute_all(self):
+        """
+        Calculate and store distances between all pairs of nodes (or all pairs within 
+        `k_distance` steps when `sparse` is True), using one traversal of the cost surface 
+        per origin.
+        
+        Returns
+        -------
+        None
+        """
+        for from_ind, from_node in enumerate(self.node_names):
+            to_inds = self._row_targets(from_ind, self.neighbours)
+            self.get_many(from_node, [self.node_names[i] for i in to_inds])
+    
+    def precompute_parallel(self, n_workers=None, rows_per_task=10):
+        """
+        Calculate and store distances between all pairs of nodes (or all pairs within 
+        `k_distance` steps when `sparse` is True), spreading origins across ray actors.
+        
+        The cost surface (and landmark costs, if any) are placed in ray's object store 
+        once and shared by all actors. Each actor searches with the same settings as this 
+        object, but keeps its own surface cache (of up to `surface_cache_bytes`), which is 
+        cleared (deleting any surfaces spilled to `spill_dir`) once all tasks finish. Start a 
+        ray cluster (`ray.init()`) beforehand to control the resources used; otherwise a 
+        local cluster is started automatically.
+        
+        Parameters
+        ----------
+        n_workers: Number of actors to start (default: the number of CPUs available to 
+                   ray).
+        rows_per_task: Number of origins processed by each task submitted to an actor.
+        
+        Returns
+        -------
+        None
+        """
+        if self.method == "hex_graph":
+            # Shortest paths through the hex graph are cheap enough to find serially
+            self.precompute_all()
+            return
+        
+        # Only calculate distances not yet stored
+        flat_values = self._flat_values()
+        rows = []
+        
+        for from_ind, from_node in enumerate(self.node_names):
+            to_inds = self._row_targets(from_ind, self.neighbours)
+            value_inds = self._value_index(full_like(to_inds, from_ind), to_inds)
+            to_inds = to_inds[isnan(flat_values[value_inds])]
+            
+            if len(to_inds) > 0:
+                rows.append((from_node, [self.node_names[i] for i in to_inds]))
+        
+        if len(rows) == 0:
+            return
+        
+        if not ray.is_initialized():
+            ray.init()
+        
+        if n_workers is None:
+            n_workers = max(int(ray.available_resources().get("CPU", 1)), 1)
+        
+        settings = {
+            "window_padding": self.window_padding,
+            "max_cost": self.max_cost,
+            "surface_cache_bytes": self.surface_cache_bytes,
+            "spill_dir": self.spill_dir,
+            "search": self.search,
+            "pyramid_factor": self.pyramid_factor,
+            "pyramid_aggregation": self.pyramid_aggregation,
+            "pyramid_tolerance": self.pyramid_tolerance
+        }
+        
+        cost_ref = ray.put(self.cost_raster)
+        landmark_costs_ref = None if self.landmark_costs is None else ray.put(self.landmark_costs)
+        workers = [
+            _LeastCostWorker.remote(cost_ref, self.raster_transform, self.resolution, settings,
+                                    self.landmark_cells, landmark_costs_ref, 
+                                    self.landmark_tolerance)
+            for _ in range(min(n_workers, len(rows)))
+        ]
+        
+        tasks = [rows[i:(i + rows_per_task)] for i in range(0, len(rows), rows_per_task)]
+        pool = ActorPool(workers)
+        
+        start_time = perf_counter()
+        results = pool.map_unordered(lambda worker, task: worker.compute_rows.remote(task), tasks)
+        
+        try:
+            for task_rows in results:
+                for from_node, to_nodes, costs in task_rows:
+                    self.set_many(from_node, to_nodes, costs)
+                    self.n_misses += len(costs)
+        finally:
+            # Surfaces spilled by the actors would otherwise be left in spill_dir
+            ray.get([worker.clear_surface_cache.remote() for worker in workers])
+        
+        self.calculate_time += perf_counter() - start_time
+    
+    def build_hex_graph(self):
+        """
+        Calculate the least cost between each hexagon at `resolution` within `node_names` 
+        and each of its immediate neighbours, using windowed searches of the cost surface. 
+        The result is stored as a sparse adjacency matrix in `hex_graph`, with one node 
+        per hexagon in `hex_graph_nodes` (the children of each hexagon in `node_names` in 
+        turn, or the hexagons themselves when `resolution` matches theirs).
+        
+        This is done automatically when first needed if `method` is "hex_graph".
+        
+        Returns
+        -------
+        None
+        """
+        start_time = perf_counter()
+        
+        # Windowed searches are exact: padding is increased if a cheaper path could exist
+        edge_distance = CoordinateLeastCostDistance(self.cost_raster, self.raster_transform,
+                                                    window_padding=self.hex_window_padding)
+        
+        children = [h3_children(node, self.resolution) for node in self.node_names]
+        graph_nodes = [child for node_children in children for child in node_children]
+        neighbours = _k_ring_neighbours(graph_nodes, 1)
+        
+        from_parts = []
+        to_parts = []
+        cost_parts = []
+        
+        for from_ind, from_node in enumerate(graph_nodes):
+            to_inds = neighbours[from_ind]
+            to_inds = to_inds[(to_inds >= 0) & (to_inds != from_ind)]
+            
+            if len(to_inds) == 0:
+                continue
+            
+            to_nodes = [graph_nodes[i] for i in to_inds]
+            costs = _h3_row_costs(edge_distance, from_node, to_nodes, self.resolution)
+            
+            # Impassable edges are left out of the graph
+            passable = isfinite(costs)
+            from_parts.append(full_like(to_inds[passable], from_ind))
+            to_parts.append(to_inds[passable])
+            cost_parts.append(costs[passable])
+        
+        n_graph_nodes = len(graph_nodes)
+        
+        if len(cost_parts) == 0:
+            self.hex_graph = csr_matrix((n_graph_nodes, n_graph_nodes))
+        else:
+            self.hex_graph = csr_matrix(
+                (concatenate(cost_parts), (concatenate(from_parts), concatenate(to_parts))),
+                shape=(n_graph_nodes, n_graph_nodes)
+            )
+        
+        self.hex_graph_nodes = graph_nodes
+        self._hex_graph_starts = cumsum([0] + [len(c) for c in children])
+        self.hex_graph_build_time = perf_counter() - start_time
+    
+    def _hex_graph_costs(self, from_inds):
+        """
+        Get shortest path costs through the hex graph from several origins (given as 
+        indices into `node_names`) to all nodes, using the cheapest child of each.
+        """
+        if self.hex_graph is None:
+            self.build_hex_graph()
+        
+        limit = inf if self.max_cost is None else self.max_cost
+        starts = self._hex_graph_starts
+        costs = np_full((len(from_inds), len(self.node_names)), inf)
+        
+        for i, from_ind in enumerate(from_inds):
+            child_costs = dijkstra(self.hex_graph, directed=True, limit=limit, min_only=True,
+                                   indices=arange(starts[from_ind], starts[from_ind + 1]))
+            costs[i] = minimum.reduceat(child_costs, starts[:-1])
+        
+        return costs
+    
+    def compare_hex_graph(self, n_origins=10, seed=None):
+        """
+        Compare distances from the hex graph (`method="hex_graph"`) to those found by 
+        searching the full cost surface, for a random sample of origins.
+        
+        Parameters
+        ----------
+        n_origins: Number of origins to sample (each compared to all other nodes).
+        seed: Optional seed for the random number generator used to sample origins.
+        
+        Returns
+        -------
+        A pandas dataframe with one row per pair of nodes compared, containing the
+        columns "from_node", "to_node", "raster_cost", "hex_graph_cost", "relative_error", 
+        "raster_time" and "hex_graph_time". Times are seconds taken to calculate 
+        distances from each origin (excluding the time taken to build the hex graph, 
+        which is stored in `hex_graph_build_time`).
+        """
+        if self.hex_graph is None:
+            self.build_hex_graph()
+        
+        n_nodes = len(self.node_names)
+        rng = default_rng(seed)
+        from_inds = rng.choice(n_nodes, size=min(n_origins, n_nodes), replace=False)
+        
+        # Full-surface searches (not windowed, and ignoring any cached surfaces)
+        raster_distance = CoordinateLeastCostDistance(self.cost_raster, self.raster_transform)
+        results = []
+        
+        for from_ind in from_inds:
+            from_node = self.node_names[from_ind]
+            
+            start_time = perf_counter()
+            raster_costs = _h3_row_costs(raster_distance, from_node, self.node_names, 
+                                         self.resolution)
+            raster_time = perf_counter() - start_time
+            
+            start_time = perf_counter()
+            graph_costs = self._hex_graph_costs([from_ind])[0]
+            graph_time = perf_counter() - start_time
+            
+            # Exclude the origin's distance to itself
+            to_inds = arange(n_nodes) != from_ind
+            raster_costs = raster_costs[to_inds]
+            graph_costs = graph_costs[to_inds]
+            
+            results.append(DataFrame({
+                "from_node": from_node,
+                "to_node": [n for n, keep in zip(self.node_names, to_inds) if keep],
+                "raster_cost": raster_costs,
+                "hex_graph_cost": graph_costs,
+                "relative_error": (graph_costs - raster_costs) / raster_costs,
+                "raster_time": raster_time,
+                "hex_graph_time": graph_time
+            }))
+        
+        return concat(results, ignore_index=True)
+    
+    def _row_targets(self, from_ind, neighbours):
+        """
+        Indices of the destinations to precompute for a given origin, optionally limited 
+        to those listed in a neighbour table.
+        """
+        if neighbours is None:
+            to_inds = arange(len(self.node_names))
+        else:
+            to_inds = neighbours[from_ind]
+            to_inds = to_inds[to_inds >= 0]
+        
+        if self.symmetric:
+            # Calculate each pair once, from the first node unless only the second lists it
+            if neighbours is None:
+                to_inds = to_inds[to_inds >= from_ind]
+            else:
+                listed_by_other = (neighbours[to_inds] == from_ind).any(axis=1)
+                to_inds = to_inds[(to_inds >= from_ind) | ~listed_by_other]
+        
+        return to_inds
 
     def get_costs_from_h3(self, from_hex, to_hex):
         """
@@ -124,8 +1524,8 @@ class LeastCostDistance(CachedEdgeFeature, CoordinateLeastCostDistance):
         # Get costs
         if self.resolution == self.base_resolution:
             # If resolution matches, get least cost between centres of hexagons
-            from_center = h3_to_geo(from_hex)
-            to_center = h3_to_geo(to_hex)
+            from_center = h3_centre(from_hex)
+            to_center = h3_centre(to_hex)
             
             min_cost = self.get_costs_from_geo([from_center], [to_center])
             
@@ -134,11 +1534,8 @@ class LeastCostDistance(CachedEdgeFeature, CoordinateLeastCostDistance):
 
         else:
             # Get hexagons inside the specified hexagons, then costs between the centres of these:
-            from_children = h3_to_children(from_hex, res=self.resolution)
-            from_centres = [h3_to_geo(c) for c in from_children]
-
-            to_children = h3_to_children(to_hex, res=self.resolution)
-            to_centres = [h3_to_geo(c) for c in to_children]
+            from_centres = h3_points(from_hex, self.resolution)
+            to_centres = h3_points(to_hex, self.resolution)
 
             # Costs
             # - Getting costs to all end points at once more efficient, since they will be 
@@ -162,4 +1559,45 @@ class LeastCostDistance(CachedEdgeFeature, CoordinateLeastCostDistance):
         -------
         float
         """
+        if self.method == "hex_graph":
+            return self.calculate_many([from_node], [to_node])[0]
+        
         return self.get_costs_from_h3(from_node, to_node)
+    
+    def calculate_many(self, from_nodes, to_nodes):
+        """
+        Calculate least cost distances for several pairs of nodes, using one traversal of
+        the cost surface (or hex graph) per origin.
+        
+        Parameters
+        ----------
+        from_nodes: A list of origin node identifiers.
+        to_nodes: A list of destination node identifiers, of the same length as `from_nodes`.
+        
+        Returns
+        -------
+        A numpy array of distances, one for each pair.
+        """
+        # Group destinations by origin
+        rows = {}
+        
+        for i, (from_node, to_node) in enumerate(zip(from_nodes, to_nodes)):
+            rows.setdefault(from_node, []).append((i, to_node))
+        
+        costs = np_full(len(from_nodes), nan)
+        
+        if self.method == "hex_graph":
+            from_inds = [self.node_index[n] for n in rows]
+            graph_costs = self._hex_graph_costs(from_inds)
+            
+            for row_costs, row in zip(graph_costs, rows.values()):
+                pair_inds, row_to_nodes = zip(*row)
+                costs[list(pair_inds)] = row_costs[[self.node_index[n] for n in row_to_nodes]]
+            
+            return costs
+        
+        for from_node, row in rows.items():
+            pair_inds, row_to_nodes = zip(*row)
+            costs[list(pair_inds)] = _h3_row_costs(self, from_node, row_to_nodes, self.resolution)
+        
+        return costs
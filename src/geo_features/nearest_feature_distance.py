@@ -0,0 +1,163 @@
+# Node feature describing the distance from each location to the nearest of a set of
+# geographic features (e.g., roads, rivers, borders or health facilities)
+
+import numpy as np
+import shapely
+from geopandas import GeoSeries
+from h3 import h3_to_geo_boundary
+from pandas import DataFrame
+from pyproj import Transformer
+from shapely.geometry import Point, Polygon
+
+from .geodetic_distance import CoordinateGeodeticDistance, _projected_nearest_distances
+from .h3_cache import h3_centre
+
+
+class NearestFeatureDistance(object):
+    """
+    A class for calculating the geodetic distance from query locations to the nearest of a
+    set of target features (points, lines or polygons).
+
+    Targets are indexed in a local projected coordinate reference system using an STRtree.
+    For each query location, the nearest target in this projection is found first, and its
+    projected and geodetic distances used to limit the targets considered further: only
+    targets within the larger of these distances (increased by `tolerance`, to allow for
+    distortion by the projection) are compared, using geodetic distances between their
+    nearest points.
+
+    Methods
+    -------
+    get(queries)
+        Find the nearest target feature for each query location.
+    get_from_h3(hex_ids)
+        Find the nearest target feature for each H3 hexagon.
+    """
+    def __init__(self, targets, id_column=None, projection_crs=None, tolerance=0.05,
+                 crs="WGS84", method="geodesic"):
+        """
+        Parameters
+        ----------
+        targets: A geopandas dataframe of target features, with a CRS specified.
+        id_column: Optional name of a column in `targets` identifying features (default:
+                   None, i.e. use the index of `targets`).
+        projection_crs: Projected CRS used to index targets and find nearest points
+                        (default: None, i.e. a UTM zone estimated from `targets`).
+        tolerance: Relative difference between projected and geodetic distances allowed
+                   for when selecting candidate targets (default: 0.05).
+        crs: A pyproj-compatible coordinate reference system specification used for
+             geodetic distances (default=WGS84).
+        method: Either "geodesic" or "haversine" (see `CoordinateGeodeticDistance`).
+        """
+        if targets.crs is None:
+            raise ValueError("targets must have a CRS specified.")
+
+        if projection_crs is None:
+            projection_crs = targets.estimate_utm_crs()
+
+        self.distance = CoordinateGeodeticDistance(crs, method=method)
+        self.projection_crs = projection_crs
+        self.tolerance = tolerance
+        self.transformer = Transformer.from_crs(projection_crs, self.distance.crs.geodetic_crs,
+                                                always_xy=True)
+
+        if id_column is None:
+            self.target_ids = targets.index.to_numpy()
+        else:
+            self.target_ids = targets[id_column].to_numpy()
+
+        self.target_geometries = targets.geometry.to_crs(projection_crs).to_numpy()
+        self.tree = shapely.STRtree(self.target_geometries)
+
+    def get(self, queries):
+        """
+        Find the nearest target feature for each query location.
+
+        Parameters
+        ----------
+        queries: A geopandas GeoSeries or GeoDataFrame of query locations (points, lines or
+                 polygons), with a CRS specified.
+
+        Returns
+        -------
+        A pandas dataframe with the same index as `queries`, containing the geodetic
+        distance to the nearest target ("distance") and the target's identifier
+        ("feature_id").
+        """
+        if queries.crs is None:
+            raise ValueError("queries must have a CRS specified.")
+
+        query_geometries = queries.geometry.to_crs(self.projection_crs).to_numpy()
+        n_queries = len(query_geometries)
+
+        # Nearest target in the projection, and its geodetic distance
+        (nearest_query_inds, nearest_target_inds) = self.tree.query_nearest(
+            query_geometries, all_matches=False
+        )
+        nearest_geodetic_dists = _projected_nearest_distances(
+            self.distance, self.transformer, query_geometries[nearest_query_inds],
+            self.target_geometries[nearest_target_inds]
+        )
+        nearest_projected_dists = shapely.distance(query_geometries[nearest_query_inds],
+                                                   self.target_geometries[nearest_target_inds])
+
+        # Other targets could only be closer if their projected distance is within this
+        # range. This is in projected units, so is based on the larger of the two distances
+        # in case the projection stretches distances.
+        initial_dists = np.full(n_queries, np.inf)
+        initial_dists[nearest_query_inds] = np.maximum(nearest_geodetic_dists,
+                                                       nearest_projected_dists)
+
+        query_inds, target_inds = self.tree.query(
+            query_geometries,
+            predicate="dwithin",
+            distance=initial_dists * (1 + self.tolerance)
+        )
+
+        dists = _projected_nearest_distances(
+            self.distance, self.transformer, query_geometries[query_inds],
+            self.target_geometries[target_inds]
+        )
+
+        # Always keep the nearest target in the projection as a candidate
+        query_inds = np.concatenate([nearest_query_inds, query_inds])
+        target_inds = np.concatenate([nearest_target_inds, target_inds])
+        dists = np.concatenate([nearest_geodetic_dists, dists])
+
+        # Keep the nearest candidate for each query
+        order = np.lexsort((dists, query_inds))
+        query_inds, target_inds, dists = query_inds[order], target_inds[order], dists[order]
+        first = np.unique(query_inds, return_index=True)[1]
+
+        nearest_dists = np.full(n_queries, np.nan)
+        nearest_dists[query_inds[first]] = dists[first]
+
+        nearest_ids = np.full(n_queries, None, dtype=object)
+        nearest_ids[query_inds[first]] = self.target_ids[target_inds[first]]
+
+        return DataFrame({"distance": nearest_dists, "feature_id": nearest_ids},
+                         index=queries.index)
+
+    def get_from_h3(self, hex_ids, use_boundaries=False):
+        """
+        Find the nearest target feature for each of a set of H3 hexagons.
+
+        Parameters
+        ----------
+        hex_ids: An iterable of H3 hexagon identifiers.
+        use_boundaries: Whether to measure distances from the boundary of each hexagon
+                        (True), or from its centre (False; the default).
+
+        Returns
+        -------
+        A pandas dataframe indexed by hexagon identifier (see `get()`).
+        """
+        hex_ids = list(hex_ids)
+
+        if use_boundaries:
+            geometries = [Polygon(h3_to_geo_boundary(h, geo_json=True)) for h in hex_ids]
+        else:
+            geometries = [Point(lon, lat) for lat, lon in (h3_centre(h) for h in hex_ids)]
+
+        queries = GeoSeries(geometries, index=hex_ids, crs=self.distance.crs.geodetic_crs)
+
+        return self.get(queries)
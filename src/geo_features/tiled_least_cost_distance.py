@@ -0,0 +1,378 @@
+# Least cost distances on cost rasters too large to hold in memory, searching one tile of
+# the raster at a time
+
+import os
+from heapq import heappop, heappush
+from math import sqrt
+from tempfile import mkdtemp, mkstemp
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from rasterio import open as rio_open
+from rasterio.windows import Window
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from .least_cost_distance import _check_cells, _geo_to_cells
+
+
+# (row offset, column offset, step length) of the moves between 8-connected cells,
+# listing each pair of neighbours once
+_GRID_STEPS = [(0, 1, 1.0), (1, 0, 1.0), (1, 1, sqrt(2)), (1, -1, sqrt(2))]
+
+
+def _tile_costs(costs, seed_costs, max_cost=np.inf):
+    """
+    Get least costs to all cells in a tile of the cost surface, given the cumulative costs
+    already known for some of its cells.
+
+    Moves are between 8-connected cells, costing the mean of the two cells' costs
+    multiplied by the distance between their centres (as in `MCP_Geometric`). Negative,
+    infinite and NaN costs are impassable. As in `MCP_Geometric`, paths can leave
+    impassable cells with known costs (i.e. start cells), using their own cost for the
+    first move (unless that cost is infinite or NaN).
+
+    Parameters
+    ----------
+    costs: A 2D numpy array of cell costs.
+    seed_costs: A numpy array of the same shape, giving known cumulative costs (infinite
+                where unknown).
+    max_cost: Costs above this are not searched, and are returned as infinite (default:
+              infinite).
+
+    Returns
+    -------
+    A numpy array of cumulative costs, of the same shape as `costs`.
+    """
+    n_rows, n_cols = costs.shape
+    n_cells = n_rows * n_cols
+    passable = np.isfinite(costs) & (costs >= 0)
+    leaving = np.isfinite(seed_costs) & np.isfinite(costs) & ~passable
+    cell_ids = np.arange(n_cells).reshape(costs.shape)
+    seed_costs = seed_costs.copy()
+
+    from_parts = []
+    to_parts = []
+    weight_parts = []
+
+    for row_step, col_step, length in _GRID_STEPS:
+        # Each cell in `a` is paired with its neighbour in `b`
+        a = (slice(0, n_rows - row_step), slice(max(-col_step, 0), n_cols - max(col_step, 0)))
+        b = (slice(row_step, n_rows), slice(max(col_step, 0), n_cols - max(-col_step, 0)))
+
+        both_passable = passable[a] & passable[b]
+        a_ids = cell_ids[a][both_passable]
+        b_ids = cell_ids[b][both_passable]
+        weights = length * (costs[a][both_passable] + costs[b][both_passable]) / 2
+
+        from_parts.extend([a_ids, b_ids])
+        to_parts.extend([b_ids, a_ids])
+        weight_parts.extend([weights, weights])
+
+        # Moves out of impassable start cells (which may cost less than zero) are applied
+        # directly to the known costs of their neighbours
+        for start, end in [(a, b), (b, a)]:
+            moves = leaving[start] & passable[end]
+
+            if moves.any():
+                move_costs = (seed_costs[start][moves] +
+                              length * (costs[start][moves] + costs[end][moves]) / 2)
+                end_costs = seed_costs[end]
+                end_costs[moves] = np.minimum(end_costs[moves], move_costs)
+
+    seed_costs[seed_costs > max_cost] = np.inf
+    seeds = np.flatnonzero(np.isfinite(seed_costs))
+
+    if len(seeds) == 0:
+        return seed_costs
+
+    # A super-source linked to each cell with a known cost (explicit zero weights are
+    # edges in scipy's sparse graphs). Seed costs are offset to be non-negative, which
+    # doesn't change any least cost paths since each passes through exactly one seed.
+    seed_values = seed_costs.reshape(-1)[seeds]
+    offset = seed_values.min()
+    from_parts.append(np.full(len(seeds), n_cells))
+    to_parts.append(seeds)
+    weight_parts.append(seed_values - offset)
+
+    graph = csr_matrix(
+        (np.concatenate(weight_parts), (np.concatenate(from_parts), np.concatenate(to_parts))),
+        shape=(n_cells + 1, n_cells + 1)
+    )
+
+    tile_costs = dijkstra(graph, directed=True, indices=n_cells, limit=max_cost - offset)
+
+    return tile_costs[:n_cells].reshape(costs.shape) + offset
+
+
+class TiledLeastCostDistance(object):
+    """
+    A class for calculating least cost distances from geographic coordinates, on cost
+    rasters too large to hold in memory.
+
+    The cost raster is read from file one tile at a time, with each tile extended by a
+    halo of cells overlapping its neighbours. Cumulative costs are held in a memory-mapped
+    file. Starting from the tiles containing start points, each tile is searched using
+    the cumulative costs already known for its cells, and any tile whose cells (including
+    halos) were improved is searched again. Since every move between cells lies within
+    some tile, the result matches a search of the whole raster. Larger halos let paths
+    cross more of each tile boundary in a single search, reducing the number of repeated
+    searches.
+
+    Tiles are searched in order of the lowest cost improved in them, and searching stops
+    once no tile can improve any end point's cost (or all remaining improvements exceed
+    `max_cost`). Each search still covers a whole tile, so queries between nearby points
+    may search several tiles, while queries between distant points (or to unreachable end
+    points without `max_cost`) may search the whole raster.
+
+    Costs follow `CoordinateLeastCostDistance` (and `MCP_Geometric`): moves are between
+    8-connected cells, costing the mean of the two cells' costs multiplied by the distance
+    between them. Negative, infinite, NaN and nodata costs are impassable, although paths
+    can leave impassable start cells (other than NaN and nodata cells) using their own
+    cost for the first move, as in `MCP_Geometric`.
+
+    Memory use is roughly 150 bytes per cell in a tile (including its halo). The
+    cumulative cost file takes 8 bytes per cell of the raster on disk, and is deleted by
+    `close()` (or on leaving a `with` block), along with the work directory if it was
+    created by this object.
+
+    Methods
+    -------
+    get_costs_from_geo(start_points, end_points)
+        Get least cost distances between a set of possible start and end points.
+    close()
+        Delete the cumulative cost file.
+    """
+    def __init__(self, raster_path, tile_size=1024, halo=64, band=1, work_dir=None,
+                 max_cost=None):
+        """
+        Parameters
+        ----------
+        raster_path: Path to a raster file to use as the cost surface.
+        tile_size: Number of rows and columns in each tile (excluding halos).
+        halo: Number of cells by which tiles overlap their neighbours.
+        band: Raster band containing costs (default: 1).
+        work_dir: Optional directory in which to store cumulative costs, in a file unique
+                  to this object (default: None, i.e. a new temporary directory).
+        max_cost: Optional cost above which paths are not considered (default: None).
+        """
+        if tile_size < 1:
+            raise ValueError("tile_size must be >= 1.")
+
+        if halo < 1:
+            raise ValueError("halo must be >= 1.")
+
+        with rio_open(raster_path) as f:
+            self.raster_transform = f.transform
+            self.shape = f.shape
+
+        self._owns_work_dir = work_dir is None
+
+        if work_dir is None:
+            work_dir = mkdtemp()
+
+        self.raster_path = raster_path
+        self.tile_size = tile_size
+        self.halo = halo
+        self.band = band
+        self.work_dir = work_dir
+        self.max_cost = np.inf if max_cost is None else max_cost
+        self.cumulative_cost = None
+        self._cumulative_cost_file = None
+        self._touched_windows = []
+        self.n_tile_searches = 0
+
+        n_rows, n_cols = self.shape
+        self.n_tiles = (-(-n_rows // tile_size), -(-n_cols // tile_size))
+
+    def get_costs_from_geo(self, start_points, end_points):
+        """
+        Get the least cost path between a set of possible start and end points.
+
+        The cumulative cost surface from the start points is kept in `cumulative_cost` (a
+        memory-mapped array) until the next call. Since searching stops early, only costs
+        up to the highest end point cost are final, and unsearched cells are infinite.
+
+        Parameters
+        ----------
+        start_points: An iterable of starting coordinates, with each coordinate a (lat, lon)
+                      tuple, or a numpy array with one (lat, lon) row per coordinate.
+        end_points: An iterable of end coordinates (as for `start_points`).
+
+        Returns
+        -------
+        A numpy array of costs, corresponding to each end point (and using the nearest/cheapest
+        start point).
+        """
+        xy_from = _geo_to_cells(self.raster_transform, start_points)
+        xy_to = _geo_to_cells(self.raster_transform, end_points)
+        _check_cells(xy_from, self.shape, "start")
+        _check_cells(xy_to, self.shape, "end")
+
+        cumulative_cost = self._reset_cumulative_cost()
+        cumulative_cost[xy_from[:, 0], xy_from[:, 1]] = 0
+
+        # Start cells need resetting even if no tile search changes them (e.g. when all
+        # their neighbours are impassable)
+        self._touched_windows.extend((row, row + 1, col, col + 1)
+                                     for row, col in xy_from.tolist())
+        self.n_tile_searches = 0
+
+        # Tiles to search, keyed by the lowest cost improved in them since they were last
+        # searched (which no costs found by searching them can be lower than). Start tiles
+        # come first, since moves out of start cells can cost less than zero.
+        pending = {tile: -np.inf for tile in map(tuple, (xy_from // self.tile_size).tolist())}
+        queue = [(key, tile) for tile, key in pending.items()]
+
+        while queue:
+            key, tile = heappop(queue)
+
+            if pending.get(tile) != key:
+                continue
+
+            end_costs = cumulative_cost[xy_to[:, 0], xy_to[:, 1]]
+
+            if key > self.max_cost or key >= end_costs.max():
+                break
+
+            del pending[tile]
+
+            for updated_tile, updated_key in self._search_tile(tile).items():
+                if updated_key < pending.get(updated_tile, np.inf):
+                    pending[updated_tile] = updated_key
+                    heappush(queue, (updated_key, updated_tile))
+
+        cumulative_cost.flush()
+        end_costs = np.array(cumulative_cost[xy_to[:, 0], xy_to[:, 1]])
+        end_costs[end_costs > self.max_cost] = np.inf
+
+        return end_costs
+
+    def _reset_cumulative_cost(self):
+        """
+        Create (or reset) the memory-mapped cumulative cost surface.
+        """
+        if self.cumulative_cost is None:
+            # A unique file, so that objects can share a work directory
+            os.makedirs(self.work_dir, exist_ok=True)
+            handle, self._cumulative_cost_file = mkstemp(prefix="cumulative_cost_",
+                                                         suffix=".npy", dir=self.work_dir)
+            os.close(handle)
+            self.cumulative_cost = open_memmap(self._cumulative_cost_file, mode="w+",
+                                               dtype=np.float64, shape=self.shape)
+
+            # Fill one block of rows at a time to avoid creating a full-size array
+            for row_start in range(0, self.shape[0], self.tile_size):
+                self.cumulative_cost[row_start:(row_start + self.tile_size)] = np.inf
+        else:
+            # Only cells written by the previous query need resetting
+            for row_start, row_end, col_start, col_end in self._touched_windows:
+                self.cumulative_cost[row_start:row_end, col_start:col_end] = np.inf
+
+        self._touched_windows = []
+
+        return self.cumulative_cost
+
+    def close(self):
+        """
+        Delete the cumulative cost file (and the work directory, if it was created by this
+        object). A new file is created if further queries are made.
+
+        Returns
+        -------
+        None
+        """
+        self.cumulative_cost = None
+        self._touched_windows = []
+
+        if self._cumulative_cost_file is not None:
+            os.remove(self._cumulative_cost_file)
+            self._cumulative_cost_file = None
+
+        if self._owns_work_dir and os.path.isdir(self.work_dir):
+            os.rmdir(self.work_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _tile_window(self, tile):
+        """
+        Get the (row_start, row_end, col_start, col_end) of a tile, including its halo.
+        """
+        n_rows, n_cols = self.shape
+        tile_row, tile_col = tile
+
+        row_start = max(tile_row * self.tile_size - self.halo, 0)
+        row_end = min((tile_row + 1) * self.tile_size + self.halo, n_rows)
+        col_start = max(tile_col * self.tile_size - self.halo, 0)
+        col_end = min((tile_col + 1) * self.tile_size + self.halo, n_cols)
+
+        return row_start, row_end, col_start, col_end
+
+    def _read_costs(self, row_start, row_end, col_start, col_end):
+        """
+        Read part of the cost raster, with nodata cells set to NaN.
+        """
+        window = Window(col_start, row_start, col_end - col_start, row_end - row_start)
+
+        with rio_open(self.raster_path) as f:
+            costs = f.read(self.band, window=window, masked=True)
+
+        return costs.astype(np.float64).filled(np.nan)
+
+    def _search_tile(self, tile):
+        """
+        Search one tile (with its halo), updating cumulative costs. Returns a dictionary
+        mapping tiles overlapping any improved cells, which need to be searched again, to
+        the lowest improved cost in each.
+        """
+        row_start, row_end, col_start, col_end = self._tile_window(tile)
+        costs = self._read_costs(row_start, row_end, col_start, col_end)
+        known_costs = np.array(self.cumulative_cost[row_start:row_end, col_start:col_end])
+
+        tile_costs = _tile_costs(costs, known_costs, self.max_cost)
+        self.n_tile_searches += 1
+
+        # Ignore differences due to rounding, so that tiles don't keep updating each other
+        improved = ((tile_costs < known_costs) &
+                    ~np.isclose(tile_costs, known_costs, rtol=1e-12, atol=0))
+
+        if not improved.any():
+            return {}
+
+        known_costs[improved] = tile_costs[improved]
+        self.cumulative_cost[row_start:row_end, col_start:col_end] = known_costs
+        self._touched_windows.append((row_start, row_end, col_start, col_end))
+
+        # Tiles whose windows (tile and halo) overlap the improved cells
+        rows, cols = np.nonzero(improved)
+        first_tile_row = max(row_start + rows.min() - self.halo, 0) // self.tile_size
+        last_tile_row = min(row_start + rows.max() + self.halo, self.shape[0] - 1) // self.tile_size
+        first_tile_col = max(col_start + cols.min() - self.halo, 0) // self.tile_size
+        last_tile_col = min(col_start + cols.max() + self.halo, self.shape[1] - 1) // self.tile_size
+
+        improved_costs = np.where(improved, tile_costs, np.inf)
+        updated = {}
+
+        for tile_row in range(first_tile_row, last_tile_row + 1):
+            for tile_col in range(first_tile_col, last_tile_col + 1):
+                # This tile's own costs are already consistent
+                if (tile_row, tile_col) == tile:
+                    continue
+
+                # Lowest improved cost within the overlap with the other tile's window
+                other_row_start, other_row_end, other_col_start, other_col_end = \
+                    self._tile_window((tile_row, tile_col))
+                overlap = improved_costs[
+                    max(other_row_start - row_start, 0):(other_row_end - row_start),
+                    max(other_col_start - col_start, 0):(other_col_end - col_start)
+                ]
+                lowest_cost = overlap.min() if overlap.size else np.inf
+
+                if lowest_cost < np.inf:
+                    updated[(tile_row, tile_col)] = lowest_cost
+
+        return updated
@@ -0,0 +1,42 @@
+# Helpers shared by the least cost distance tests
+
+import numpy as np
+from rasterio.transform import Affine
+from skimage.graph import MCP_Geometric
+
+
+# One unit per cell, with the top left corner at (lat, lon) = (50, 100)
+TRANSFORM = Affine(1, 0, 100, 0, -1, 50)
+
+
+def cells_to_geo(cells):
+    """
+    Get the (lat, lon) coordinates of the centres of (row, col) cells in `TRANSFORM`.
+    """
+    cells = np.asarray(cells, dtype=float)
+
+    return np.column_stack([50 - (cells[:, 0] + 0.5), 100 + cells[:, 1] + 0.5])
+
+
+def mcp_costs(cost_raster, xy_from, xy_to, max_cost=None):
+    """
+    Get the least costs between cells found by `MCP_Geometric`.
+    """
+    cumulative_costs, _ = MCP_Geometric(cost_raster).find_costs(list(map(tuple, xy_from)))
+    costs = cumulative_costs[xy_to[:, 0], xy_to[:, 1]]
+
+    if max_cost is not None:
+        costs = np.where(costs > max_cost, np.inf, costs)
+
+    return costs
+
+
+def random_raster(rng, shape=(40, 40)):
+    """
+    A random cost raster, with some negative and infinite (impassable) cells.
+    """
+    cost_raster = rng.uniform(0.5, 3, shape)
+    cost_raster[rng.random(shape) < 0.2] = -1
+    cost_raster[rng.random(shape) < 0.05] = np.inf
+
+    return cost_raster
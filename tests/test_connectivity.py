@@ -0,0 +1,108 @@
+# Tests for connectivity between locations
+
+import numpy as np
+import pytest
+
+from geo_features.connectivity import gravity_connectivity, power_law_kernel
+from geo_features.geodetic_distance import CoordinateGeodeticDistance
+
+
+def random_locations(rng, n):
+    locations = np.column_stack([rng.uniform(-10, 10, n), rng.uniform(30, 50, n)])
+
+    # Include a duplicate location, so that some destinations are equally distant
+    locations[-1] = locations[0]
+
+    return locations
+
+
+def naive_radiation(dists, masses):
+    n_locations = len(masses)
+    expected = np.zeros((n_locations, n_locations))
+
+    for i in range(n_locations):
+        for j in range(n_locations):
+            if i == j:
+                continue
+
+            # Total mass of locations strictly closer to i than j is, excluding i and j
+            closer = [k for k in range(n_locations)
+                      if k not in (i, j) and dists[i, k] < dists[i, j]]
+            s = masses[closer].sum()
+
+            expected[i, j] = (masses[i] * masses[i] * masses[j]
+                              / ((masses[i] + s) * (masses[i] + masses[j] + s)))
+
+    return expected
+
+
+def naive_gravity(dists, masses, kernel):
+    expected = masses[:, None] * masses[None, :] * kernel(dists)
+    np.fill_diagonal(expected, 0)
+
+    return expected
+
+
+@pytest.mark.parametrize("max_block_size", [10000000, 50])
+def test_radiation_matches_naive(max_block_size):
+    rng = np.random.default_rng(0)
+    locations = random_locations(rng, 25)
+    masses = rng.uniform(1, 100, 25)
+    dists = CoordinateGeodeticDistance().get_pairwise_distances(locations)
+
+    connectivity = gravity_connectivity(locations, masses, "radiation",
+                                        max_block_size=max_block_size)
+
+    np.testing.assert_allclose(connectivity.toarray(), naive_radiation(dists, masses))
+
+
+@pytest.mark.parametrize("max_block_size", [10000000, 50])
+def test_gravity_matches_naive(max_block_size):
+    rng = np.random.default_rng(1)
+    locations = random_locations(rng, 25)
+    masses = rng.uniform(1, 100, 25)
+    dists = CoordinateGeodeticDistance().get_pairwise_distances(locations)
+    kernel = power_law_kernel(2, min_distance=1000)
+
+    connectivity = gravity_connectivity(locations, masses, kernel,
+                                        max_block_size=max_block_size)
+
+    np.testing.assert_allclose(connectivity.toarray(), naive_gravity(dists, masses, kernel))
+
+
+@pytest.mark.parametrize("kernel", ["radiation", "power_law"])
+def test_top_k_and_threshold(kernel):
+    rng = np.random.default_rng(2)
+    locations = random_locations(rng, 25)
+    masses = rng.uniform(1, 100, 25)
+    dists = CoordinateGeodeticDistance().get_pairwise_distances(locations)
+
+    if kernel == "radiation":
+        expected = naive_radiation(dists, masses)
+    else:
+        kernel = power_law_kernel(2, min_distance=1000)
+        expected = naive_gravity(dists, masses, kernel)
+
+    # Keep the 5 strongest connections from each origin
+    top_k = gravity_connectivity(locations, masses, kernel, top_k=5).toarray()
+    expected_top_k = np.zeros_like(expected)
+
+    for i, row in enumerate(expected):
+        strongest = np.argsort(row)[-5:]
+        expected_top_k[i, strongest] = row[strongest]
+
+    np.testing.assert_allclose(top_k, expected_top_k)
+    assert ((top_k > 0).sum(axis=1) == 5).all()
+
+    # Drop connections below the median
+    threshold = np.median(expected[expected > 0])
+    thresholded = gravity_connectivity(locations, masses, kernel, threshold=threshold)
+
+    np.testing.assert_allclose(thresholded.toarray(),
+                               np.where(expected >= threshold, expected, 0))
+
+    # Both together
+    both = gravity_connectivity(locations, masses, kernel, top_k=5, threshold=threshold)
+
+    np.testing.assert_allclose(both.toarray(),
+                               np.where(expected_top_k >= threshold, expected_top_k, 0))
@@ -0,0 +1,31 @@
+# Tests for the cached edge feature base class
+
+import numpy as np
+import pytest
+
+from geo_features.edge_feature import CachedEdgeFeature
+
+
+class IndexDifference(CachedEdgeFeature):
+    """
+    An edge feature giving the difference between two integer node names.
+    """
+    def calculate(self, from_node, to_node):
+        return to_node - from_node
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_save_to_cache_file(tmp_path, symmetric):
+    cache_file = str(tmp_path / "cache.npy")
+    feature = IndexDifference(list(range(5)), cache_file=cache_file, symmetric=symmetric)
+    feature.get(1, 3)
+
+    # Saving a memory-mapped store to its own file only flushes it
+    feature.save(cache_file)
+    feature.save(tmp_path / "copy")
+    assert feature.get(1, 3) == 2
+
+    for filename in [cache_file, tmp_path / "copy.npy"]:
+        restored = IndexDifference(list(range(5)), symmetric=symmetric)
+        restored.restore(filename)
+        np.testing.assert_array_equal(restored.stored_values, feature.stored_values)
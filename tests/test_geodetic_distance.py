@@ -0,0 +1,156 @@
+# Tests for geodetic distances between locations
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from h3 import geo_to_h3, k_ring
+from shapely.geometry import box
+
+from geo_features.distance_reducers import NearestDestination
+from geo_features.geodetic_distance import (CoordinateGeodeticDistance, GeodeticDistance,
+                                            GeodeticNeighbourIndex)
+
+
+NODE_NAMES = sorted(k_ring(geo_to_h3(-1.3, 36.8, 5), 2))
+
+
+def random_locations(rng, n):
+    # Clustered around the antimeridian and the north pole, plus scattered locations
+    lats = np.concatenate([rng.uniform(-5, 5, n // 3), rng.uniform(85, 90, n // 3),
+                           rng.uniform(-90, 90, n - 2 * (n // 3))])
+    lons = np.concatenate([rng.uniform(175, 185, n // 3), rng.uniform(-180, 180, n // 3),
+                           rng.uniform(-180, 180, n - 2 * (n // 3))])
+    return np.column_stack([lats, ((lons + 180) % 360) - 180])
+
+
+def brute_force_distances(index, points):
+    lats1, lats2 = np.meshgrid(points[:, 0], index.lats, indexing="ij")
+    lons1, lons2 = np.meshgrid(points[:, 1], index.lons, indexing="ij")
+    return np.asarray(index._distances(lons1.ravel(), lats1.ravel(), lons2.ravel(), 
+                                       lats2.ravel())).reshape(lats1.shape)
+
+
+def test_precompute_parallel_restored_file(tmp_path):
+    expected = GeodeticDistance(NODE_NAMES)
+    expected.precompute()
+    expected.save(tmp_path / "distances.npy")
+
+    # Workers write to the restored file, which isn't the (unset) cache file
+    distance = GeodeticDistance(NODE_NAMES)
+    distance.restore(tmp_path / "distances.npy", mmap_mode="r+")
+    distance.stored_values[:] = np.nan
+    distance.precompute(n_jobs=2)
+
+    np.testing.assert_allclose(distance.stored_values, expected.stored_values)
+
+
+def test_haversine_error_bound():
+    # Documented as at most about 0.56% for WGS84
+    rng = np.random.default_rng(0)
+    lons1, lons2 = rng.uniform(-180, 180, (2, 100000))
+    lats1, lats2 = np.degrees(np.arcsin(rng.uniform(-1, 1, (2, 100000))))
+
+    # Short north-south distances at the equator, where the error is largest
+    lons1 = np.append(lons1, 0)
+    lats1 = np.append(lats1, 0)
+    lons2 = np.append(lons2, 0)
+    lats2 = np.append(lats2, 0.01)
+
+    haversine = CoordinateGeodeticDistance(method="haversine")
+    geodesic = CoordinateGeodeticDistance()
+    approximate = haversine._distances(lons1, lats1, lons2, lats2)
+    exact = geodesic.geod.inv(lons1, lats1, lons2, lats2)[2]
+
+    relative_error = np.abs(approximate - exact) / exact
+    assert relative_error.max() < 0.0057
+
+
+def test_reduce_distances_empty():
+    distance = CoordinateGeodeticDistance()
+    destinations = [(0, 0), (1, 1)]
+
+    dists, inds = distance.reduce_distances([], destinations, NearestDestination())
+    assert dists.shape == inds.shape == (0, )
+
+    with pytest.raises(ValueError):
+        distance.reduce_distances([(0, 0)], [], NearestDestination())
+
+
+@pytest.mark.parametrize("method", ["geodesic", "haversine"])
+def test_neighbour_index_pairs_within(method):
+    rng = np.random.default_rng(0)
+    locations = random_locations(rng, 150)
+    index = GeodeticNeighbourIndex(locations, method=method)
+    expected = brute_force_distances(index, locations)
+
+    from_inds, to_inds, dists = index.pairs_within(300000)
+    expected_from, expected_to = np.nonzero(np.triu(expected <= 300000, k=1))
+
+    assert (from_inds < to_inds).all()
+    assert (sorted(zip(from_inds, to_inds)) == 
+            sorted(zip(expected_from, expected_to)))
+    np.testing.assert_allclose(dists, expected[from_inds, to_inds])
+
+
+@pytest.mark.parametrize("method", ["geodesic", "haversine"])
+def test_neighbour_index_query_radius(method):
+    rng = np.random.default_rng(1)
+    index = GeodeticNeighbourIndex(random_locations(rng, 150), method=method)
+    points = random_locations(rng, 60)
+    expected = brute_force_distances(index, points)
+
+    point_inds, index_inds, dists = index.query_radius(points, 500000)
+    expected_points, expected_index = np.nonzero(expected <= 500000)
+
+    assert (np.diff(point_inds) >= 0).all()
+    assert (sorted(zip(point_inds, index_inds)) == 
+            sorted(zip(expected_points, expected_index)))
+    np.testing.assert_allclose(dists, expected[point_inds, index_inds])
+
+
+@pytest.mark.parametrize("k", [1, 5])
+def test_neighbour_index_query_nearest(k):
+    rng = np.random.default_rng(2)
+    index = GeodeticNeighbourIndex(random_locations(rng, 150))
+    points = random_locations(rng, 60)
+    expected = brute_force_distances(index, points)
+
+    dists, inds = index.query_nearest(points, k=k)
+
+    np.testing.assert_allclose(dists, np.sort(expected, axis=1)[:, :k])
+    np.testing.assert_array_equal(inds, np.argsort(expected, axis=1)[:, :k])
+
+    with pytest.raises(ValueError):
+        index.query_nearest(points, k=151)
+
+
+def test_boundary_distances_blocks():
+    rng = np.random.default_rng(3)
+    corners = rng.uniform(-1, 1, (12, 2))
+    polygons = gpd.GeoSeries([box(x, y, x + 0.3, y + 0.2) for x, y in corners], crs="EPSG:4326")
+    distance = CoordinateGeodeticDistance()
+
+    expected = distance.get_boundary_distances(polygons)
+    assert (expected == expected.T).all()
+    assert (expected == 0).sum() > len(polygons)
+
+    np.testing.assert_allclose(distance.get_boundary_distances(polygons, block_size=7), expected)
+
+    from_inds, to_inds, dists = distance.get_boundary_distances(polygons, max_distance=50000,
+                                                                block_size=7)
+    expected_from, expected_to = np.nonzero(np.triu(expected <= 50000, k=1))
+    assert sorted(zip(from_inds, to_inds)) == sorted(zip(expected_from, expected_to))
+    np.testing.assert_allclose(dists, expected[from_inds, to_inds])
+
+
+def test_boundary_distances_empty():
+    distance = CoordinateGeodeticDistance()
+    polygons = gpd.GeoSeries([], crs="EPSG:4326")
+
+    assert distance.get_boundary_distances(polygons).shape == (0, 0)
+
+    from_inds, to_inds, dists = distance.get_boundary_distances(polygons, max_distance=1000)
+    assert len(from_inds) == len(to_inds) == len(dists) == 0
+
+    single = gpd.GeoSeries([box(0, 0, 1, 1)], crs="EPSG:4326")
+    assert distance.get_boundary_distances(single).shape == (1, 1)
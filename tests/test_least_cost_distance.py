@@ -0,0 +1,233 @@
+# Tests comparing least cost searches with MCP_Geometric
+
+import numpy as np
+import pytest
+from h3 import geo_to_h3, k_ring
+from rasterio.transform import Affine
+
+from conftest import TRANSFORM, cells_to_geo, mcp_costs, random_raster
+from geo_features.least_cost_distance import CoordinateLeastCostDistance, LeastCostDistance
+
+
+@pytest.mark.parametrize("search", ["dijkstra", "astar"])
+def test_impassable_start_cell(search):
+    cost_raster = np.ones((20, 20))
+    cost_raster[0, 0] = -1
+    xy_from = np.array([[0, 0]])
+    xy_to = np.array([[5, 5], [19, 19], [0, 0]])
+
+    distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM, search=search)
+
+    if search == "astar":
+        distance.build_landmarks(2, seed=0)
+
+    costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+
+    # Leaving the start cell costs (-1 + 1) / 2 = 0 per unit length
+    np.testing.assert_allclose(costs, mcp_costs(cost_raster, xy_from, xy_to))
+    assert costs[0] == pytest.approx(4 * np.sqrt(2))
+
+
+@pytest.mark.parametrize("max_cost", [None, 20])
+def test_astar_matches_mcp(max_cost):
+    rng = np.random.default_rng(0)
+
+    for _ in range(30):
+        cost_raster = random_raster(rng)
+        xy_from = rng.integers(0, 40, (2, 2))
+        xy_to = rng.integers(0, 40, (5, 2))
+
+        distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM, max_cost=max_cost,
+                                               search="astar")
+        distance.build_landmarks(2, seed=0)
+        assert distance._uses_astar(xy_to)
+        costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+
+        np.testing.assert_allclose(costs, mcp_costs(cost_raster, xy_from, xy_to, max_cost))
+
+
+def test_astar_needs_landmarks_and_few_end_cells():
+    distance = CoordinateLeastCostDistance(np.ones((20, 20)), TRANSFORM, search="astar")
+    assert not distance._uses_astar(np.array([[0, 0]]))
+
+    distance.build_landmarks(2, seed=0)
+    assert distance._uses_astar(np.array([[0, 0]]))
+    assert not distance._uses_astar(np.array([[0, i] for i in range(9)]))
+
+
+def test_astar_with_landmarks_matches_mcp():
+    rng = np.random.default_rng(1)
+    cost_raster = random_raster(rng)
+
+    distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM, max_cost=20, search="astar")
+    distance.build_landmarks(4, seed=0)
+
+    for _ in range(30):
+        xy_from = rng.integers(0, 40, (1, 2))
+        xy_to = rng.integers(0, 40, (3, 2))
+        costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+
+        np.testing.assert_allclose(costs, mcp_costs(cost_raster, xy_from, xy_to, 20))
+
+
+def test_landmark_bounds_contain_mcp_costs():
+    rng = np.random.default_rng(3)
+    cost_raster = random_raster(rng)
+
+    distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM)
+    distance.build_landmarks(4, seed=0)
+
+    for _ in range(30):
+        xy_from = rng.integers(0, 40, (7, 2))
+        xy_to = rng.integers(0, 40, (5, 2))
+        lower, upper = distance.cost_bounds(cells_to_geo(xy_from), cells_to_geo(xy_to))
+        costs = mcp_costs(cost_raster, xy_from, xy_to)
+
+        assert np.all(lower <= costs + 1e-9)
+        assert np.all(upper >= costs - 1e-9)
+
+
+def test_pyramid_settings_forwarded():
+    node_names = sorted(k_ring(geo_to_h3(-1, 36, 6), 1))
+    raster_transform = Affine(0.01, 0, 35.5, 0, -0.01, -0.5)
+    cost_raster = np.random.default_rng(0).uniform(1, 3, (100, 100))
+
+    exact = LeastCostDistance(node_names, cost_raster, raster_transform, resolution=6)
+    pyramid = LeastCostDistance(node_names, cost_raster, raster_transform, resolution=6,
+                                search="pyramid", pyramid_factor=4,
+                                pyramid_aggregation="mean", pyramid_tolerance=0.2)
+
+    assert (pyramid.pyramid_factor, pyramid.pyramid_aggregation) == (4, "mean")
+    assert pyramid.pyramid_tolerance == 0.2
+
+    # Pyramid costs are never below exact costs
+    exact_costs = exact.get_many(node_names[:1] * 7, node_names)
+    pyramid_costs = pyramid.get_many(node_names[:1] * 7, node_names)
+    assert np.all(pyramid_costs >= exact_costs * (1 - 1e-9))
+
+
+def test_sparse_symmetric_store():
+    node_names = sorted(k_ring(geo_to_h3(-1, 36, 6), 3))
+    raster_transform = Affine(0.01, 0, 35.5, 0, -0.01, -0.5)
+    cost_raster = np.random.default_rng(0).uniform(1, 3, (100, 100))
+
+    full = LeastCostDistance(node_names, cost_raster, raster_transform, resolution=6,
+                             k_distance=2, sparse=True)
+    half = LeastCostDistance(node_names, cost_raster, raster_transform, resolution=6,
+                             k_distance=2, sparse=True, symmetric=True)
+
+    # Each pair is stored once, in about half the space
+    assert half.stored_values.shape[1] == 10
+    full.precompute_all()
+    half.precompute_all()
+    assert not np.isnan(half.stored_values[half.neighbours >= 0]).any()
+
+    for from_node in node_names:
+        to_nodes = [n for n in k_ring(from_node, 2) if n in full.node_index]
+        np.testing.assert_allclose(half.get_many(from_node, to_nodes),
+                                   full.get_many(from_node, to_nodes))
+
+    assert half.n_misses == np.sum(half.neighbours >= 0)
+
+
+def test_windowed_negative_start_cell():
+    # A cheap way round a wall, reachable because leaving the start cell costs < 0
+    cost_raster = np.ones((60, 60))
+    cost_raster[20:40, 28:32] = 10
+    cost_raster[30, 25] = -50
+    xy_from = np.array([[30, 25]])
+    xy_to = np.array([[30, 35]])
+    expected = mcp_costs(cost_raster, xy_from, xy_to)
+
+    for settings in [{"window_padding": 1}, {"window_padding": 5}, {"max_cost": 5}]:
+        distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM, **settings)
+        costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+
+        np.testing.assert_allclose(costs, expected)
+
+
+@pytest.mark.parametrize("settings", [{"window_padding": 2}, {"max_cost": 20}])
+def test_windowed_matches_mcp(settings):
+    rng = np.random.default_rng(2)
+
+    for _ in range(30):
+        cost_raster = random_raster(rng)
+        xy_from = rng.integers(0, 40, (2, 2))
+        xy_to = rng.integers(0, 40, (5, 2))
+
+        distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM, **settings)
+        costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+
+        expected = mcp_costs(cost_raster, xy_from, xy_to, settings.get("max_cost"))
+        np.testing.assert_allclose(costs, expected)
+
+
+def test_generator_points():
+    cost_raster = np.ones((20, 20))
+    distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM)
+
+    costs = distance.get_costs_from_geo((p for p in cells_to_geo([[0, 0]])),
+                                        (p for p in cells_to_geo([[0, 5], [3, 0]])))
+
+    np.testing.assert_allclose(costs, [5, 3])
+
+
+@pytest.mark.parametrize("resolution", [6, 7])
+def test_hex_graph_never_below_raster(resolution):
+    node_names = sorted(k_ring(geo_to_h3(-1, 36, 6), 2))
+    raster_transform = Affine(0.005, 0, 35.6, 0, -0.005, -0.6)
+    cost_raster = np.random.default_rng(0).uniform(1, 3, (160, 160))
+
+    distance = LeastCostDistance(node_names, cost_raster, raster_transform, resolution,
+                                 method="hex_graph")
+    comparison = distance.compare_hex_graph(n_origins=5, seed=0)
+
+    # Paths through the graph are paths on the cost surface, so can't cost less
+    assert np.isfinite(comparison["hex_graph_cost"]).all()
+    assert comparison["relative_error"].min() > -1e-9
+    assert comparison["relative_error"].mean() < 0.2
+
+    # Distances through get() use the same graph
+    row = comparison[comparison["from_node"] == comparison["from_node"].iloc[0]]
+    costs = distance.get_many(row["from_node"].tolist(), row["to_node"].tolist())
+    np.testing.assert_allclose(costs, row["hex_graph_cost"])
+
+
+def test_surface_cache_eviction_and_spilling(tmp_path):
+    rng = np.random.default_rng(0)
+    cost_raster = random_raster(rng, (20, 20))
+    xy_to = np.array([[19, 19], [10, 3], [0, 15]])
+    starts = [np.array([[2, 2]]), np.array([[5, 17]]), np.array([[15, 8], [3, 3]])]
+
+    # Room for two surfaces in memory
+    distance = CoordinateLeastCostDistance(cost_raster, TRANSFORM,
+                                           surface_cache_bytes=2 * cost_raster.nbytes,
+                                           spill_dir=tmp_path)
+
+    for xy_from in starts + [starts[0]]:
+        costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+        np.testing.assert_allclose(costs, mcp_costs(cost_raster, xy_from, xy_to))
+
+    # The first surface was evicted to disk, then found there
+    info = distance.surface_cache_info()
+    assert (info["hits"], info["misses"]) == (1, 3)
+    assert (info["n_in_memory"], info["n_spilled"]) == (2, 1)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Using the third surface leaves the second as the least recently used in memory
+    distance.get_costs_from_geo(cells_to_geo(starts[2][::-1]), cells_to_geo(xy_to))
+    assert distance.surface_cache_info()["hits"] == 2
+
+    distance.get_costs_from_geo(cells_to_geo([[0, 0]]), cells_to_geo(xy_to))
+    info = distance.surface_cache_info()
+    assert (info["n_in_memory"], info["n_spilled"]) == (2, 2)
+    assert len(list(tmp_path.iterdir())) == 2
+
+    distance.get_costs_from_geo(cells_to_geo(starts[1]), cells_to_geo(xy_to))
+    assert distance.surface_cache_info()["hits"] == 3
+    assert len(list(tmp_path.iterdir())) == 2
+
+    distance.clear_surface_cache()
+    info = distance.surface_cache_info()
+    assert (info["n_in_memory"], info["n_spilled"], info["memory_bytes"]) == (0, 0, 0)
+    assert len(list(tmp_path.iterdir())) == 0
@@ -0,0 +1,26 @@
+# Tests for distances to the nearest of a set of features
+
+import numpy as np
+from geopandas import GeoDataFrame, GeoSeries
+from shapely.geometry import LineString, Point
+
+from geo_features.nearest_feature_distance import NearestFeatureDistance
+
+
+def test_distorted_projection():
+    # Features spanning 60 degrees of longitude, so UTM distances are badly distorted
+    rng = np.random.default_rng(0)
+    lines = [LineString([(lon, lat), (lon + 1, lat + 0.5)])
+             for lon, lat in zip(rng.uniform(-20, 40, 50), rng.uniform(-30, 30, 50))]
+    targets = GeoDataFrame(geometry=lines, crs="EPSG:4326")
+    queries = GeoSeries([Point(lon, lat) for lon, lat in
+                         zip(rng.uniform(-20, 40, 200), rng.uniform(-30, 30, 200))],
+                        crs="EPSG:4326")
+
+    nearest = NearestFeatureDistance(targets).get(queries)
+
+    # Comparing all targets with each query
+    exhaustive = NearestFeatureDistance(targets, tolerance=100).get(queries)
+
+    assert nearest["feature_id"].notna().all()
+    np.testing.assert_allclose(nearest["distance"], exhaustive["distance"])
@@ -0,0 +1,112 @@
+# Tests comparing tiled least cost searches with MCP_Geometric
+
+import os
+
+import numpy as np
+import pytest
+import rasterio
+
+from conftest import TRANSFORM, cells_to_geo, mcp_costs, random_raster
+from geo_features.tiled_least_cost_distance import TiledLeastCostDistance
+
+
+def write_raster(path, cost_raster):
+    """
+    Write a cost raster to a GeoTIFF file.
+    """
+    n_rows, n_cols = cost_raster.shape
+
+    with rasterio.open(path, "w", driver="GTiff", height=n_rows, width=n_cols, count=1,
+                       dtype="float64", transform=TRANSFORM) as f:
+        f.write(cost_raster, 1)
+
+
+def test_impassable_start_cell(tmp_path):
+    cost_raster = np.ones((20, 20))
+    cost_raster[0, 0] = -1
+    write_raster(tmp_path / "costs.tif", cost_raster)
+    xy_from = np.array([[0, 0]])
+    xy_to = np.array([[5, 5], [19, 19]])
+
+    distance = TiledLeastCostDistance(tmp_path / "costs.tif", tile_size=8, halo=2,
+                                      work_dir=tmp_path)
+    costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+
+    np.testing.assert_allclose(costs, mcp_costs(cost_raster, xy_from, xy_to))
+
+
+@pytest.mark.parametrize("max_cost", [None, 15])
+def test_tiled_matches_mcp(tmp_path, max_cost):
+    rng = np.random.default_rng(0)
+    cost_raster = random_raster(rng, (60, 70))
+    write_raster(tmp_path / "costs.tif", cost_raster)
+
+    distance = TiledLeastCostDistance(tmp_path / "costs.tif", tile_size=16, halo=3,
+                                      work_dir=tmp_path, max_cost=max_cost)
+
+    # Repeated queries reuse the cumulative cost surface
+    for _ in range(10):
+        xy_from = rng.integers(0, 60, (2, 2))
+        xy_to = rng.integers(0, 60, (4, 2))
+        costs = distance.get_costs_from_geo(cells_to_geo(xy_from), cells_to_geo(xy_to))
+
+        np.testing.assert_allclose(costs, mcp_costs(cost_raster, xy_from, xy_to, max_cost))
+
+
+def test_search_stops_at_end_points(tmp_path):
+    write_raster(tmp_path / "costs.tif", np.ones((64, 64)))
+
+    distance = TiledLeastCostDistance(tmp_path / "costs.tif", tile_size=8, halo=2,
+                                      work_dir=tmp_path)
+    costs = distance.get_costs_from_geo(cells_to_geo([[1, 1]]), cells_to_geo([[1, 3]]))
+
+    assert costs[0] == pytest.approx(2)
+    assert distance.n_tile_searches < distance.n_tiles[0] * distance.n_tiles[1]
+
+
+def test_isolated_start_cell_reset(tmp_path):
+    # An isolated cell on one side of an impassable wall
+    cost_raster = np.ones((40, 40))
+    cost_raster[9:12, 9:12] = -1
+    cost_raster[10, 10] = 1
+    cost_raster[:, 20] = np.inf
+    write_raster(tmp_path / "costs.tif", cost_raster)
+
+    distance = TiledLeastCostDistance(tmp_path / "costs.tif", tile_size=8, halo=2,
+                                      work_dir=tmp_path)
+    distance.get_costs_from_geo(cells_to_geo([[10, 10]]), cells_to_geo([[0, 0]]))
+
+    # The previous start cell must not act as a start cell in later queries
+    costs = distance.get_costs_from_geo(cells_to_geo([[30, 30]]), cells_to_geo([[10, 10]]))
+    assert costs[0] == np.inf
+
+
+def test_shared_work_dir(tmp_path):
+    write_raster(tmp_path / "ones.tif", np.ones((40, 40)))
+    write_raster(tmp_path / "cheap.tif", np.full((40, 40), 0.01))
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    start, end = cells_to_geo([[0, 0]]), cells_to_geo([[30, 30]])
+
+    with TiledLeastCostDistance(tmp_path / "ones.tif", tile_size=8, halo=2,
+                                work_dir=work_dir) as ones, \
+         TiledLeastCostDistance(tmp_path / "cheap.tif", tile_size=8, halo=2,
+                                work_dir=work_dir) as cheap:
+        ones_costs = ones.get_costs_from_geo(start, end)
+        cheap.get_costs_from_geo(start, end)
+
+        # Each object keeps its own cumulative cost surface
+        assert np.array(ones.cumulative_cost)[30, 30] == pytest.approx(ones_costs[0])
+        assert ones_costs[0] == pytest.approx(30 * np.sqrt(2))
+
+    assert list(work_dir.iterdir()) == []
+
+
+def test_close_removes_temporary_files(tmp_path):
+    write_raster(tmp_path / "costs.tif", np.ones((20, 20)))
+
+    distance = TiledLeastCostDistance(tmp_path / "costs.tif", tile_size=8, halo=2)
+    distance.get_costs_from_geo(cells_to_geo([[0, 0]]), cells_to_geo([[5, 5]]))
+    distance.close()
+
+    assert not os.path.exists(distance.work_dir)